@@ -1,15 +1,42 @@
+import io
+from datetime import date
+
 import streamlit as st
-from database import get_all_bookings
+from database import get_recent_bookings
+from bookings_export import EXPORT_MIME, export_bookings
+
+# The table is a preview; the export has every booking
+DASHBOARD_ROWS = 200
+
+
+def _export_file(export_format: str) -> io.BytesIO:
+    # Called by the download button on click, not on every rerun
+    buffer = io.BytesIO()
+    export_bookings(buffer, export_format)
+    return buffer
 
 
 def render_admin_dashboard():
     st.header("📊 Admin Dashboard")
 
-    bookings = get_all_bookings()
+    bookings = get_recent_bookings(DASHBOARD_ROWS)
 
     if not bookings:
         st.info("No bookings yet.")
         return
 
     st.dataframe(bookings)
+    if len(bookings) == DASHBOARD_ROWS:
+        st.caption(f"Showing the latest {DASHBOARD_ROWS} bookings. Download the export for all of them.")
 
+    st.subheader("Export")
+    export_format = st.radio(
+        "Format", list(EXPORT_MIME), horizontal=True, format_func=str.upper
+    )
+    st.download_button(
+        "⬇️ Download all bookings",
+        data=lambda: _export_file(export_format),
+        file_name=f"bookings-{date.today().isoformat()}.{export_format}",
+        mime=EXPORT_MIME[export_format],
+        on_click="ignore",
+    )
@@ -0,0 +1,313 @@
+"""
+Headless async HTTP API for the hotel assistant.
+
+Exposes chat turns, RAG queries, booking confirmation and export, and
+document ingestion over the same chat_logic / rag_pipeline functions the Streamlit app uses,
+without importing Streamlit. The bookings export and document management
+sit on an admin router that needs the X-Admin-Token header. Run with:
+
+    uvicorn api:app --host 0.0.0.0 --port 8000 --workers 4
+"""
+
+import asyncio
+import hmac
+import logging
+import uuid
+from contextlib import asynccontextmanager
+from datetime import date
+from typing import List, Optional
+
+from fastapi import APIRouter, BackgroundTasks, Depends, FastAPI, File, Header, HTTPException, UploadFile
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from booking_flow import REQUIRED_FIELDS, validate_field, validate_checkout_after_checkin
+from bookings_export import EXPORT_MIME, iter_export
+from chat_logic import initialize_chat_state, handle_user_message, FALLBACK_RESPONSE
+from config import get_secret
+from index_manager import IndexManager, shutdown as shutdown_index_builds
+from property_registry import PropertyIndexRegistry
+from rag_pipeline import rag_answer_async
+from session_store import (
+    TurnInProgress,
+    VersionConflict,
+    claim_turn,
+    get_session_store,
+    release_turn,
+)
+from tools import save_booking_tool, email_tool
+
+logger = logging.getLogger(__name__)
+
+
+# ----------------------------
+# Request / response models
+# ----------------------------
+class ChatRequest(BaseModel):
+    message: str
+    session_id: Optional[str] = None
+    property_id: Optional[str] = None
+
+
+class ChatResponse(BaseModel):
+    session_id: str
+    response: str
+    source: str  # "chat", "rag" or "fallback"
+
+
+class RagRequest(BaseModel):
+    query: str
+    property_id: Optional[str] = None
+
+
+class RagResponse(BaseModel):
+    answer: str
+
+
+class BookingRequest(BaseModel):
+    name: str
+    email: str
+    phone: str
+    room_type: str
+    check_in: str
+    check_out: str
+
+
+class BookingResponse(BaseModel):
+    booking_id: str
+    email_queued: bool
+
+
+# ----------------------------
+# Session state
+# ----------------------------
+# State lives in the shared session store so any worker can serve any turn.
+# The per-process lock only serialises turns that land on the same worker;
+# across workers the turn lease from session_store.claim_turn does.
+# Entries are [lock, holders and waiters] and are dropped when the count
+# reaches zero, so the map only holds sessions with a turn in flight.
+_session_locks = {}
+
+
+@asynccontextmanager
+async def _session_lock(session_id: str):
+    entry = _session_locks.setdefault(session_id, [asyncio.Lock(), 0])
+    entry[1] += 1
+    try:
+        async with entry[0]:
+            yield
+    finally:
+        entry[1] -= 1
+        if entry[1] == 0:
+            del _session_locks[session_id]
+
+
+async def _claim_turn(store, session_id: str) -> tuple:
+    """claim_turn with its failures mapped to 409s. Returns (state, version)."""
+    try:
+        return await asyncio.to_thread(claim_turn, store, session_id, initialize_chat_state)
+    except TurnInProgress:
+        raise HTTPException(
+            status_code=409,
+            detail="Your previous message is still being processed. Please try again shortly.",
+        )
+    except VersionConflict:
+        raise HTTPException(
+            status_code=409,
+            detail="This conversation was updated elsewhere. Please resend your message.",
+        )
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.index_manager = await asyncio.to_thread(IndexManager)
+    app.state.property_registry = PropertyIndexRegistry()
+    app.state.session_store = get_session_store()
+    yield
+    shutdown_index_builds()
+
+
+app = FastAPI(title="Hotel Booking AI Assistant", lifespan=lifespan)
+
+
+def _check_property(property_id: Optional[str]):
+    if property_id is None:
+        return
+    try:
+        app.state.property_registry.property_dir(property_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+async def _vectorstore_for(property_id: Optional[str]):
+    """Index for a property (multi-hotel deployments), else the default one."""
+    if property_id is None:
+        return app.state.index_manager.current()
+    try:
+        # First query for a property loads its index from disk
+        return await asyncio.to_thread(app.state.property_registry.get, property_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/health")
+async def health():
+    return {"status": "ok", "index_version": app.state.index_manager.current_version}
+
+
+@app.post("/chat", response_model=ChatResponse)
+async def chat(request: ChatRequest):
+    session_id = request.session_id or uuid.uuid4().hex
+
+    store = app.state.session_store
+    # Reject a bad property before the turn runs and gets saved
+    _check_property(request.property_id)
+
+    async with _session_lock(session_id):
+        state, version = await _claim_turn(store, session_id)
+
+        # Booking logic is synchronous and may hit Supabase/SendGrid on
+        # "confirm", so it runs off the event loop. The lease taken above
+        # keeps other workers off this session until the turn is saved, so
+        # a booking can't be confirmed twice.
+        try:
+            response = await asyncio.to_thread(handle_user_message, state, request.message)
+        finally:
+            try:
+                await asyncio.to_thread(release_turn, store, session_id, state, version)
+            except VersionConflict:
+                # Only possible if the turn outlived its lease
+                logger.warning("Session %s lease expired mid-turn; turn not saved", session_id)
+        source = "chat"
+
+        if response is None:
+            # Booking turns never touch the index, so they can't evict one
+            vectorstore = await _vectorstore_for(request.property_id)
+            if vectorstore is not None:
+                response = await rag_answer_async(request.message, vectorstore)
+                source = "rag"
+
+        if response is None:
+            response = FALLBACK_RESPONSE
+            source = "fallback"
+
+    return ChatResponse(session_id=session_id, response=response, source=source)
+
+
+@app.post("/rag/query", response_model=RagResponse)
+async def rag_query(request: RagRequest):
+    vectorstore = await _vectorstore_for(request.property_id)
+    answer = await rag_answer_async(request.query, vectorstore)
+    return RagResponse(answer=answer)
+
+
+@app.post("/bookings/confirm", response_model=BookingResponse)
+async def confirm_booking(request: BookingRequest, background_tasks: BackgroundTasks):
+    booking_state = {}
+    for field in REQUIRED_FIELDS:
+        is_valid, error, cleaned = validate_field(field, getattr(request, field))
+        if not is_valid:
+            raise HTTPException(status_code=422, detail={"field": field, "error": error})
+        booking_state[field] = cleaned
+
+    is_valid, error = validate_checkout_after_checkin(booking_state)
+    if not is_valid:
+        raise HTTPException(status_code=422, detail={"field": "check_out", "error": error})
+
+    booking_id = await asyncio.to_thread(save_booking_tool, booking_state)
+
+    # The guest gets their booking id without waiting on SendGrid
+    background_tasks.add_task(email_tool, booking_state["email"], booking_id, booking_state)
+
+    return BookingResponse(booking_id=str(booking_id), email_queued=True)
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """
+    Admin endpoints need the X-Admin-Token header to match ADMIN_API_TOKEN.
+    With no token configured they stay closed.
+    """
+    expected = get_secret("ADMIN_API_TOKEN")
+    if not expected or x_admin_token is None or not hmac.compare_digest(
+        x_admin_token.encode("utf-8"), expected.encode("utf-8")
+    ):
+        raise HTTPException(status_code=403, detail="Admin token required.")
+
+
+# Guest PII and knowledge-base changes: staff only, never the public channels
+admin = APIRouter(dependencies=[Depends(require_admin)])
+
+
+@admin.get("/bookings/export")
+def export_bookings(format: str = "csv"):
+    """Every booking (guest PII) as CSV or Parquet, streamed page by page."""
+    if format not in EXPORT_MIME:
+        raise HTTPException(status_code=400, detail=f"Unsupported export format: {format}")
+
+    filename = f"bookings-{date.today().isoformat()}.{format}"
+    # A plain iterator: Starlette pulls it from a worker thread, so the
+    # blocking page fetches stay off the event loop
+    return StreamingResponse(
+        iter_export(format),
+        media_type=EXPORT_MIME[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@admin.post("/documents", status_code=202)
+async def upload_documents(files: List[UploadFile] = File(...)):
+    payload = [(f.filename, await f.read()) for f in files]
+    try:
+        version = app.state.index_manager.submit(payload)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    return {"status": "building", "version": version, "files": len(files)}
+
+
+@admin.get("/documents/status")
+async def documents_status():
+    manager = app.state.index_manager
+    return {
+        "current_version": manager.current_version,
+        "building_version": manager.building_version,
+        "versions": manager.versions(),
+        "last_error": manager.last_error,
+        "last_stats": manager.last_stats,
+    }
+
+
+@admin.post("/documents/rollback")
+async def rollback_documents(version: Optional[int] = None):
+    try:
+        version = await asyncio.to_thread(app.state.index_manager.rollback, version)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    return {"status": "ok", "current_version": version}
+
+
+@admin.get("/properties")
+async def list_properties():
+    registry = app.state.property_registry
+    return {"properties": registry.properties(), "cache": registry.stats()}
+
+
+@admin.post("/properties/{property_id}/documents", status_code=202)
+async def upload_property_documents(property_id: str, files: List[UploadFile] = File(...)):
+    try:
+        builder = app.state.property_registry.builder(property_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    payload = [(f.filename, await f.read()) for f in files]
+    try:
+        version = builder.submit(payload)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    return {"status": "building", "property_id": property_id, "version": version, "files": len(files)}
+
+
+# Routes are copied at include time, so this stays below them
+app.include_router(admin)
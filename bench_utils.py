@@ -0,0 +1,44 @@
+"""
+Helpers shared by the offline tools: the load test, the local service
+stand-ins and the retrieval evaluation harness.
+"""
+
+import hashlib
+import math
+import re
+
+EMBEDDING_DIM = 768
+
+
+def deterministic_embedding(text: str, dim: int = EMBEDDING_DIM, ngrams: int = 1) -> list:
+    """
+    Hash each token into a fixed-size vector and L2-normalise it.
+    Same text always gives the same vector, and texts sharing words land
+    close together, which is all retrieval needs to behave sensibly.
+    With ngrams > 1, runs of up to that many words are hashed too.
+    """
+    words = re.findall(r"[a-z0-9]+", text.lower())
+    tokens = [
+        " ".join(words[i:i + n])
+        for n in range(1, ngrams + 1)
+        for i in range(len(words) - n + 1)
+    ]
+
+    vector = [0.0] * dim
+    for token in tokens:
+        digest = hashlib.md5(token.encode("utf-8")).digest()
+        index = int.from_bytes(digest[:4], "little") % dim
+        sign = 1.0 if digest[4] & 1 else -1.0
+        vector[index] += sign
+
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+def percentile(values: list, pct: float) -> float:
+    """Nearest-rank percentile; 0.0 for an empty list."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[rank - 1]
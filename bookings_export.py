@@ -0,0 +1,196 @@
+"""
+Streaming bookings export for finance.
+
+Bookings are read one page at a time with keyset paging
+(database.iter_booking_pages). Each page is written straight out as CSV
+rows or as one Parquet row group (zstd-compressed), so memory stays bounded
+by a single page however large the table grows. The same byte stream backs
+the CLI below, the API's GET /bookings/export and the Admin page's
+download button.
+
+Nightly job:
+    python bookings_export.py --format parquet --output /exports/bookings.parquet
+
+Progress and the final row count go to stderr.
+"""
+
+import argparse
+import csv
+import io
+import os
+import sys
+import time
+from datetime import date
+
+from database import iter_booking_pages
+
+DEFAULT_PAGE_SIZE = 1000
+
+EXPORT_COLUMNS = [
+    "id",
+    "room_type",
+    "check_in",
+    "check_out",
+    "status",
+    "created_at",
+    "customer_name",
+    "customer_email",
+]
+
+EXPORT_MIME = {
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def flatten_booking(row: dict) -> dict:
+    """One export row: the booking plus its embedded customer fields."""
+    customer = row.get("customers") or {}
+    return {
+        "id": row.get("id"),
+        "room_type": row.get("room_type"),
+        "check_in": row.get("check_in"),
+        "check_out": row.get("check_out"),
+        "status": row.get("status"),
+        "created_at": row.get("created_at"),
+        "customer_name": customer.get("name"),
+        "customer_email": customer.get("email"),
+    }
+
+
+# ----------------------------
+# Writers
+# ----------------------------
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands back whatever was written since the last drain."""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def csv_chunks(pages):
+    """Yield CSV bytes: the header, then one chunk per page of bookings."""
+    sink = _ChunkSink()
+    text = io.TextIOWrapper(sink, encoding="utf-8", newline="", write_through=True)
+    writer = csv.DictWriter(text, fieldnames=EXPORT_COLUMNS)
+    writer.writeheader()
+    yield sink.drain()
+
+    for page in pages:
+        writer.writerows(flatten_booking(row) for row in page)
+        yield sink.drain()
+
+
+def parquet_chunks(pages):
+    """Yield Parquet bytes: one zstd-compressed row group per page of bookings."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow).")
+
+    schema = pa.schema([
+        ("id", pa.string()),
+        ("room_type", pa.string()),
+        ("check_in", pa.date32()),
+        ("check_out", pa.date32()),
+        ("status", pa.string()),
+        ("created_at", pa.string()),
+        ("customer_name", pa.string()),
+        ("customer_email", pa.string()),
+    ])
+
+    sink = _ChunkSink()
+    with pq.ParquetWriter(sink, schema, compression="zstd") as writer:
+        for page in pages:
+            rows = [flatten_booking(row) for row in page]
+            for row in rows:
+                row["id"] = None if row["id"] is None else str(row["id"])
+                for column in ("check_in", "check_out"):
+                    if row[column]:
+                        row[column] = date.fromisoformat(row[column][:10])
+            writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+            yield sink.drain()
+    # Closing writes the footer
+    yield sink.drain()
+
+
+CHUNKERS = {"csv": csv_chunks, "parquet": parquet_chunks}
+
+
+def iter_export(fmt: str = "csv", page_size: int = DEFAULT_PAGE_SIZE, counter: dict = None):
+    """
+    Yield the export of every booking as byte chunks, one page at a time.
+    Pass a dict as `counter` to receive the row count under "rows".
+    """
+    if fmt not in CHUNKERS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+
+    def pages():
+        for page in iter_booking_pages(page_size):
+            if counter is not None:
+                counter["rows"] = counter.get("rows", 0) + len(page)
+            yield page
+
+    for chunk in CHUNKERS[fmt](pages()):
+        if chunk:
+            yield chunk
+
+
+def export_bookings(out, fmt: str = "csv", page_size: int = DEFAULT_PAGE_SIZE) -> int:
+    """Stream every booking into the binary file `out`. Returns the row count."""
+    counter = {"rows": 0}
+    for chunk in iter_export(fmt, page_size, counter):
+        out.write(chunk)
+    return counter["rows"]
+
+
+# ----------------------------
+# CLI
+# ----------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export all bookings as CSV or Parquet")
+    parser.add_argument("--format", choices=sorted(CHUNKERS), default="csv")
+    parser.add_argument("--output",
+                        help="file to write, or - for stdout (default: bookings-<date>.<format>)")
+    parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE,
+                        help="bookings fetched per request")
+    args = parser.parse_args(argv)
+
+    output = args.output or f"bookings-{date.today().isoformat()}.{args.format}"
+    start = time.perf_counter()
+
+    if output == "-":
+        count = export_bookings(sys.stdout.buffer, args.format, args.page_size)
+        sys.stdout.buffer.flush()
+    else:
+        # Write-then-rename so a failed run never leaves a partial extract
+        with open(output + ".tmp", "wb") as out:
+            count = export_bookings(out, args.format, args.page_size)
+        os.replace(output + ".tmp", output)
+
+    print(
+        f"Exported {count} bookings to {output} in {time.perf_counter() - start:.1f}s",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -11,6 +11,8 @@ from tools import save_booking_tool, email_tool
 
 MAX_MEMORY = 25
 
+FALLBACK_RESPONSE = "Please upload hotel documents or say *I want to book a room*."
+
 
 def initialize_chat_state():
     return {
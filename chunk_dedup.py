@@ -0,0 +1,132 @@
+"""
+Drop exact and near-duplicate chunks before they are embedded.
+
+Hotel PDF packs repeat the same headers, footers and policy blocks on many
+pages. Every copy costs an embedding and crowds the top-k at query time.
+Exact copies are caught by hashing normalised text. Near copies (a footer that
+differs only by page number, say) are caught with MinHash signatures bucketed
+by LSH. Only candidate pairs that share a bucket get compared.
+
+The first occurrence of each chunk is kept. The pages its duplicates came from
+are recorded on it under metadata["duplicate_sources"], so answers can still
+cite every page.
+"""
+
+import hashlib
+import math
+import re
+from typing import List, Tuple
+
+import numpy as np
+
+# google.generativeai sends at most this many texts per batchEmbedContents
+EMBED_BATCH_SIZE = 100
+
+_MERSENNE_PRIME = (1 << 31) - 1
+
+
+def _normalise(text: str) -> str:
+    return " ".join(re.findall(r"[a-z0-9]+", text.lower()))
+
+
+def _shingles(words: List[str], size: int) -> np.ndarray:
+    if len(words) < size:
+        grams = [" ".join(words)]
+    else:
+        grams = [" ".join(words[i:i + size]) for i in range(len(words) - size + 1)]
+    hashes = {
+        int.from_bytes(hashlib.blake2b(g.encode("utf-8"), digest_size=4).digest(), "little")
+        for g in grams
+    }
+    return np.fromiter(hashes, dtype=np.uint64, count=len(hashes))
+
+
+class MinHasher:
+    """MinHash signatures with fixed seeds, so runs are reproducible."""
+
+    def __init__(self, num_perm: int = 128, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self._a = rng.integers(1, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+
+    def signature(self, shingle_hashes: np.ndarray) -> np.ndarray:
+        # (a * x + b) mod p for every permutation x shingle; a, b < 2^31 and
+        # the shingle hashes x < 2^32, so a * x + b < 2^64 fits in uint64.
+        values = (np.outer(self._a, shingle_hashes) + self._b[:, None]) % _MERSENNE_PRIME
+        return values.min(axis=1)
+
+
+def dedupe_chunks(
+    chunks: List,
+    threshold: float = 0.8,
+    shingle_size: int = 3,
+    num_perm: int = 128,
+    bands: int = 32,
+) -> Tuple[List, dict]:
+    """
+    Remove exact and near-duplicate langchain Documents.
+    Returns (kept_chunks, stats). `threshold` is the estimated Jaccard
+    similarity above which two chunks count as the same.
+    """
+    rows = num_perm // bands
+    hasher = MinHasher(num_perm)
+
+    kept = []
+    signatures = []
+    buckets = {}
+    exact_index = {}
+    exact_dupes = 0
+    near_dupes = 0
+
+    for chunk in chunks:
+        normalised = _normalise(chunk.page_content)
+        digest = hashlib.sha1(normalised.encode("utf-8")).hexdigest()
+
+        if digest in exact_index:
+            _record_duplicate(kept[exact_index[digest]], chunk)
+            exact_dupes += 1
+            continue
+
+        signature = hasher.signature(_shingles(normalised.split(), shingle_size))
+        band_keys = [
+            (band, signature[band * rows:(band + 1) * rows].tobytes())
+            for band in range(bands)
+        ]
+
+        match = None
+        candidates = {i for key in band_keys for i in buckets.get(key, ())}
+        for i in sorted(candidates):
+            if np.mean(signatures[i] == signature) >= threshold:
+                match = i
+                break
+
+        if match is not None:
+            _record_duplicate(kept[match], chunk)
+            near_dupes += 1
+            continue
+
+        position = len(kept)
+        kept.append(chunk)
+        signatures.append(signature)
+        exact_index[digest] = position
+        for key in band_keys:
+            buckets.setdefault(key, []).append(position)
+
+    stats = {
+        "chunks_in": len(chunks),
+        "chunks_kept": len(kept),
+        "exact_duplicates": exact_dupes,
+        "near_duplicates": near_dupes,
+        "embeddings_saved": len(chunks) - len(kept),
+        "embedding_requests_saved": (
+            math.ceil(len(chunks) / EMBED_BATCH_SIZE) - math.ceil(len(kept) / EMBED_BATCH_SIZE)
+        ),
+    }
+    return kept, stats
+
+
+def _record_duplicate(kept_chunk, duplicate):
+    source = duplicate.metadata.get("source")
+    page = duplicate.metadata.get("page")
+    kept_chunk.metadata.setdefault("duplicate_sources", []).append(f"{source}#page={page}")
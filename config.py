@@ -1,5 +1,14 @@
+import os
+
 MAX_MEMORY_MESSAGES = 25
 
+# Chat messages rendered live on each rerun; older ones sit behind
+# a "load earlier" toggle
+CHAT_RENDER_WINDOW = 8
+
+# Chunks fetched per RAG query before context packing trims them
+RAG_CANDIDATE_K = 6
+
 REQUIRED_BOOKING_FIELDS = [
     "name",
     "email",
@@ -8,3 +17,20 @@ REQUIRED_BOOKING_FIELDS = [
     "check_in",
     "check_out"
 ]
+
+
+def get_secret(name: str, default=None):
+    """
+    Read a setting from the environment first, then Streamlit secrets.
+    Environment variables win so headless runs (load tests, workers) can
+    point the app at other endpoints without a secrets.toml.
+    """
+    value = os.getenv(name)
+    if value:
+        return value
+
+    try:
+        import streamlit as st
+        return st.secrets.get(name, default)
+    except Exception:
+        return default
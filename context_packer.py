@@ -0,0 +1,142 @@
+"""
+Pack retrieved chunks into a prompt context that fits a token budget.
+
+Chunks come out of the splitter with 100-character overlaps, so neighbouring
+hits from the same page repeat text, and boilerplate sentences recur across
+pages. The packer:
+
+1. merges overlapping/adjacent chunks from the same source page into one passage
+2. drops sentences already included from a better-scoring passage
+3. adds passages best-score first until the token budget is spent
+"""
+
+import re
+from typing import List, Tuple
+
+# Rough Gemini tokenisation for English prose; close enough for budgeting
+CHARS_PER_TOKEN = 4
+
+_MIN_OVERLAP = 20
+_MAX_OVERLAP = 300
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _text_overlap(first: str, second: str) -> int:
+    """Length of the longest suffix of `first` that is a prefix of `second`."""
+    longest = min(len(first), len(second), _MAX_OVERLAP)
+    for size in range(longest, _MIN_OVERLAP - 1, -1):
+        if first.endswith(second[:size]):
+            return size
+    return 0
+
+
+def _merge_pair(a: dict, b: dict):
+    """Merged passage if a and b overlap or touch, else None."""
+    if a["start"] is not None and b["start"] is not None:
+        if a["start"] > b["start"]:
+            a, b = b, a
+        a_end = a["start"] + len(a["text"])
+        if b["start"] > a_end:
+            return None
+        tail = b["text"][a_end - b["start"]:]
+        return {"text": a["text"] + tail, "start": a["start"], "score": min(a["score"], b["score"])}
+
+    if b["text"] in a["text"]:
+        return {**a, "score": min(a["score"], b["score"])}
+    if a["text"] in b["text"]:
+        return {**b, "score": min(a["score"], b["score"])}
+
+    for left, right in ((a, b), (b, a)):
+        overlap = _text_overlap(left["text"], right["text"])
+        if overlap:
+            return {
+                "text": left["text"] + right["text"][overlap:],
+                "start": None,
+                "score": min(a["score"], b["score"]),
+            }
+    return None
+
+
+def _merge_page(passages: List[dict]) -> List[dict]:
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(passages)):
+            for j in range(i + 1, len(passages)):
+                combined = _merge_pair(passages[i], passages[j])
+                if combined is not None:
+                    passages[i] = combined
+                    del passages[j]
+                    merged = True
+                    break
+            if merged:
+                break
+    return passages
+
+
+def pack_context(docs_and_scores: List[Tuple], token_budget: int) -> Tuple[str, dict]:
+    """
+    Build the context block from (Document, distance) pairs as returned by
+    similarity_search_with_score (lower distance = better match).
+    Returns (context, stats).
+    """
+    pages = {}
+    for doc, score in docs_and_scores:
+        key = (doc.metadata.get("source"), doc.metadata.get("page"))
+        pages.setdefault(key, []).append({
+            "text": doc.page_content.strip(),
+            "start": doc.metadata.get("start_index"),
+            "score": float(score),
+        })
+
+    passages = [p for group in pages.values() for p in _merge_page(group)]
+    passages.sort(key=lambda p: p["score"])
+
+    seen_sentences = set()
+    packed = []
+    used_tokens = 0
+    dropped_sentences = 0
+
+    for passage in passages:
+        kept = []
+        new_sentences = set()
+        repeats = 0
+        for sentence in _SENTENCE_END.split(passage["text"]):
+            normalised = " ".join(sentence.lower().split())
+            if normalised in seen_sentences or normalised in new_sentences:
+                repeats += 1
+                continue
+            new_sentences.add(normalised)
+            kept.append(sentence)
+
+        text = " ".join(kept).strip()
+        if not text:
+            dropped_sentences += repeats
+            continue
+
+        tokens = estimate_tokens(text)
+        if used_tokens + tokens > token_budget:
+            if packed:
+                # A smaller, lower-ranked passage may still fit
+                continue
+            # Never send an empty context: cut the best passage to size
+            text = text[:token_budget * CHARS_PER_TOKEN]
+            tokens = estimate_tokens(text)
+
+        packed.append(text)
+        used_tokens += tokens
+        seen_sentences |= new_sentences
+        dropped_sentences += repeats
+
+    stats = {
+        "chunks": len(docs_and_scores),
+        "passages": len(passages),
+        "packed": len(packed),
+        "sentences_dropped": dropped_sentences,
+        "context_tokens": used_tokens,
+    }
+    return "\n\n".join(packed), stats
@@ -1,34 +1,504 @@
+"""
+Booking storage behind a small backend interface.
+
+- SupabaseBookingStore  -> the hosted Postgres (default)
+- SQLiteBookingStore    -> a local file, for single-property, offline or
+                           edge deployments and for running without a network
+
+BOOKING_STORE_URL picks the backend ("supabase" or sqlite:///path/to/bookings.db).
+With SQLite, BOOKING_SYNC_TO_SUPABASE=1 also starts a SupabaseReplicator that
+copies new rows upstream in the background. It needs no Supabase schema
+changes: Supabase assigns ids as usual and the local rows record them.
+Guests are given the local booking id, so matching an upstream row to what
+a guest was told goes through the local file (see SupabaseReplicator).
+
+The module-level functions (insert_customer, insert_booking, get_all_bookings,
+...) use the configured backend, so callers don't care which one is live.
+"""
+
+import logging
+import queue
+import sqlite3
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from concurrent.futures import Future
+from datetime import datetime, timezone
+from functools import lru_cache
+
 from supabase import create_client
-import streamlit as st
+
+from config import get_secret
+
+logger = logging.getLogger(__name__)
+
+BOOKING_COLUMNS = "id, room_type, check_in, check_out, status, created_at, customers(name, email)"
+
 
 def get_supabase_client():
-    url = st.secrets["SUPABASE_URL"]
-    key = st.secrets["SUPABASE_KEY"]
+    url = get_secret("SUPABASE_URL")
+    key = get_secret("SUPABASE_KEY")
     return create_client(url, key)
+
+
+class BookingStore(ABC):
+    """Interface shared by the backends."""
+
+    @abstractmethod
+    def insert_customer(self, name: str, email: str, phone: str) -> str:
+        """Returns the new customer_id."""
+
+    @abstractmethod
+    def insert_booking(self, customer_id: str, room_type: str, check_in: str, check_out: str) -> str:
+        """Returns the new booking id."""
+
+    def save_booking(self, name: str, email: str, phone: str,
+                     room_type: str, check_in: str, check_out: str) -> str:
+        """Customer plus booking; backends that can do it in one write override this."""
+        customer_id = self.insert_customer(name, email, phone)
+        return self.insert_booking(customer_id, room_type, check_in, check_out)
+
+    @abstractmethod
+    def get_all_bookings(self) -> list:
+        """Bookings with the customer embedded as {"customers": {"name", "email"}}."""
+
+    @abstractmethod
+    def get_recent_bookings(self, limit: int = 200) -> list:
+        """The newest `limit` bookings, in get_all_bookings shape."""
+
+    @abstractmethod
+    def iter_booking_pages(self, page_size: int = 1000):
+        """Yield get_all_bookings rows one page at a time, in id order."""
+
+
+# ----------------------------
+# Supabase backend
+# ----------------------------
+class SupabaseBookingStore(BookingStore):
+    def __init__(self):
+        self._client = get_supabase_client()
+
+    def insert_customer(self, name: str, email: str, phone: str) -> str:
+        response = self._client.table("customers").insert({
+            "name": name,
+            "email": email,
+            "phone": phone
+        }).execute()
+        return response.data[0]["customer_id"]
+
+    def insert_booking(self, customer_id: str, room_type: str, check_in: str, check_out: str) -> str:
+        response = self._client.table("bookings").insert({
+            "customer_id": customer_id,
+            "room_type": room_type,
+            "check_in": check_in,
+            "check_out": check_out
+        }).execute()
+        return response.data[0]["id"]
+
+    def get_all_bookings(self) -> list:
+        response = self._client.table("bookings").select(BOOKING_COLUMNS).execute()
+        return response.data
+
+    def get_recent_bookings(self, limit: int = 200) -> list:
+        response = (
+            self._client.table("bookings").select(BOOKING_COLUMNS)
+            .order("created_at", desc=True).limit(limit).execute()
+        )
+        return response.data
+
+    def iter_booking_pages(self, page_size: int = 1000):
+        # Keyset paging (id > last id seen) keeps every page an index seek,
+        # where OFFSET would rescan all earlier rows
+        last_id = None
+
+        while True:
+            query = self._client.table("bookings").select(BOOKING_COLUMNS).order("id").limit(page_size)
+            if last_id is not None:
+                query = query.gt("id", last_id)
+            rows = query.execute().data
+            if not rows:
+                return
+
+            yield rows
+            if len(rows) < page_size:
+                return
+            last_id = rows[-1]["id"]
+
+
+# ----------------------------
+# SQLite backend
+# ----------------------------
+# Statements are constant strings with ? placeholders: sqlite3 caches the
+# compiled statement per connection, keyed by SQL text, so each is prepared
+# once per thread and reused.
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS customers ("
+    " customer_id TEXT PRIMARY KEY,"
+    " name TEXT NOT NULL,"
+    " email TEXT NOT NULL,"
+    " phone TEXT,"
+    " created_at TEXT NOT NULL,"
+    " remote_id TEXT)",
+    "CREATE TABLE IF NOT EXISTS bookings ("
+    " id TEXT PRIMARY KEY,"
+    " customer_id TEXT NOT NULL REFERENCES customers(customer_id),"
+    " room_type TEXT NOT NULL,"
+    " check_in TEXT NOT NULL,"
+    " check_out TEXT NOT NULL,"
+    " status TEXT NOT NULL DEFAULT 'confirmed',"
+    " created_at TEXT NOT NULL,"
+    " remote_id TEXT)",
+    "CREATE INDEX IF NOT EXISTS idx_customers_email ON customers(email)",
+    "CREATE INDEX IF NOT EXISTS idx_bookings_check_in ON bookings(check_in)",
+    "CREATE INDEX IF NOT EXISTS idx_bookings_room_type ON bookings(room_type)",
+    "CREATE INDEX IF NOT EXISTS idx_bookings_created_at ON bookings(created_at)",
+    # Partial indexes stay tiny: only rows the replicator hasn't pushed yet
+    "CREATE INDEX IF NOT EXISTS idx_customers_pending ON customers(customer_id) WHERE remote_id IS NULL",
+    "CREATE INDEX IF NOT EXISTS idx_bookings_pending ON bookings(id) WHERE remote_id IS NULL",
+)
+
+_INSERT_CUSTOMER = (
+    "INSERT INTO customers (customer_id, name, email, phone, created_at) VALUES (?, ?, ?, ?, ?)"
+)
+_INSERT_BOOKING = (
+    "INSERT INTO bookings (id, customer_id, room_type, check_in, check_out, created_at) "
+    "VALUES (?, ?, ?, ?, ?, ?)"
+)
+_SELECT_BOOKINGS = (
+    "SELECT b.id, b.room_type, b.check_in, b.check_out, b.status, b.created_at, c.name, c.email "
+    "FROM bookings b LEFT JOIN customers c ON c.customer_id = b.customer_id"
+)
+_SELECT_BOOKING_PAGE = _SELECT_BOOKINGS + " WHERE b.id > ? ORDER BY b.id LIMIT ?"
+_SELECT_RECENT_BOOKINGS = _SELECT_BOOKINGS + " ORDER BY b.created_at DESC LIMIT ?"
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _booking_row(row: tuple) -> dict:
+    # Same shape as the Supabase select with its embedded customer
+    return {
+        "id": row[0],
+        "room_type": row[1],
+        "check_in": row[2],
+        "check_out": row[3],
+        "status": row[4],
+        "created_at": row[5],
+        "customers": {"name": row[6], "email": row[7]},
+    }
+
+
+class SQLiteBookingStore(BookingStore):
+    def __init__(self, path: str = "bookings.db", max_batch: int = 256):
+        self.path = path
+        self.max_batch = max_batch
+        self._local = threading.local()
+        self.replicator = None
+
+        self._writes = queue.Queue()
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        self.commits = 0
+
+        conn = self._conn()
+        for statement in _SCHEMA:
+            conn.execute(statement)
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite3 connections are not shareable across threads, and Streamlit
+        # and the API both serve requests from a thread pool.
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # WAL + NORMAL: commits skip the fsync; a power cut can lose the
+            # last few commits but never corrupts the file
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    def insert_customer(self, name: str, email: str, phone: str) -> str:
+        customer_id = str(uuid.uuid4())
+        self._conn().execute(_INSERT_CUSTOMER, (customer_id, name, email, phone, _now()))
+        return customer_id
+
+    def insert_booking(self, customer_id: str, room_type: str, check_in: str, check_out: str) -> str:
+        booking_id = str(uuid.uuid4())
+        self._conn().execute(_INSERT_BOOKING, (booking_id, customer_id, room_type, check_in, check_out, _now()))
+        return booking_id
+
+    def save_booking(self, name: str, email: str, phone: str,
+                     room_type: str, check_in: str, check_out: str) -> str:
+        customer_id = str(uuid.uuid4())
+        booking_id = str(uuid.uuid4())
+        now = _now()
+
+        future = Future()
+        self._writes.put((
+            (customer_id, name, email, phone, now),
+            (booking_id, customer_id, room_type, check_in, check_out, now),
+            future,
+        ))
+        self._start_writer()
+        future.result()
+        return booking_id
+
+    # ----------------------------
+    # Group commit
+    # ----------------------------
+    # Booking writes from every thread go through one writer thread. It
+    # takes whatever has queued up while the previous commit ran and writes
+    # it all in one transaction, so under load many bookings share a commit
+    # (and the write lock) while a lone booking waits for nobody.
+    def _start_writer(self):
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name="booking-writer", daemon=True)
+                self._writer.start()
+
+    def _write_loop(self):
+        while True:
+            batch = [self._writes.get()]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._writes.get_nowait())
+                except queue.Empty:
+                    break
+
+            try:
+                self._write_batch(batch)
+            except Exception:
+                # Don't let one bad row fail the bookings it was batched with
+                for item in batch:
+                    try:
+                        self._write_batch([item])
+                        self.commits += 1
+                        item[2].set_result(None)
+                    except Exception as e:
+                        item[2].set_exception(e)
+                continue
+
+            self.commits += 1
+            for _, _, future in batch:
+                future.set_result(None)
+
+    def _write_batch(self, batch: list):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(_INSERT_CUSTOMER, [customer for customer, _, _ in batch])
+            conn.executemany(_INSERT_BOOKING, [booking for _, booking, _ in batch])
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def get_all_bookings(self) -> list:
+        return [_booking_row(row) for row in self._conn().execute(_SELECT_BOOKINGS)]
+
+    def get_recent_bookings(self, limit: int = 200) -> list:
+        return [_booking_row(row) for row in self._conn().execute(_SELECT_RECENT_BOOKINGS, (limit,))]
+
+    def iter_booking_pages(self, page_size: int = 1000):
+        last_id = ""
+        while True:
+            rows = self._conn().execute(_SELECT_BOOKING_PAGE, (last_id, page_size)).fetchall()
+            if not rows:
+                return
+            yield [_booking_row(row) for row in rows]
+            if len(rows) < page_size:
+                return
+            last_id = rows[-1][0]
+
+
+# ----------------------------
+# SQLite -> Supabase replication
+# ----------------------------
+class SupabaseReplicator:
+    """
+    Copies rows from a SQLiteBookingStore to Supabase, in batches, on a
+    background thread. Rows are inserted through the same columns the
+    Supabase backend writes, so Supabase assigns its own ids. Each local row
+    records the id it got upstream in remote_id, and bookings are sent with
+    their customer's remote id.
+
+    Limits, both because Supabase has no column for the local id:
+
+    - The booking id a guest sees in chat and email is the local one, not
+      the id Supabase assigns. Only bookings.remote_id in the local file
+      maps one to the other, so look a guest's booking up there (or in the
+      local store) rather than upstream.
+    - A crash between an upstream insert and recording its ids can resend
+      that batch once; there is nothing upstream to deduplicate on.
+    """
+
+    # Columns the replicator writes, checked against Supabase at startup
+    UPSTREAM_COLUMNS = {
+        "customers": ("customer_id", "name", "email", "phone"),
+        "bookings": ("id", "customer_id", "room_type", "check_in", "check_out"),
+    }
+
+    def __init__(self, store: SQLiteBookingStore, interval_seconds: float = 30.0, batch_size: int = 500):
+        self.store = store
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        self.last_error = None
+        self.synced_rows = 0
+
+        self._client = get_supabase_client()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def check_schema(self):
+        """Fail fast if Supabase lacks a table or column the replicator writes."""
+        for table, columns in self.UPSTREAM_COLUMNS.items():
+            try:
+                self._client.table(table).select(", ".join(columns)).limit(1).execute()
+            except Exception as e:
+                raise RuntimeError(
+                    f"Supabase table {table} does not match the columns the replicator "
+                    f"writes ({', '.join(columns)}): {e}"
+                ) from e
+
+    def start(self):
+        if self._thread is None:
+            self.check_schema()
+            self._thread = threading.Thread(target=self._run, name="supabase-replicator", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def pending(self) -> dict:
+        conn = self.store._conn()
+        return {
+            table: conn.execute(f"SELECT COUNT(*) FROM {table} WHERE remote_id IS NULL").fetchone()[0]
+            for table in ("customers", "bookings")
+        }
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.sync_once()
+                self.last_error = None
+            except Exception as e:
+                # Offline is an expected state at the edge; retry next round,
+                # but say how much is waiting
+                logger.error("Supabase sync failed (%s pending): %s", self.pending(), e)
+                self.last_error = str(e)
+            self._stop.wait(self.interval_seconds)
+
+    def sync_once(self) -> int:
+        """Push everything pending now. Returns the number of rows pushed."""
+        conn = self.store._conn()
+        pushed = 0
+
+        # Customers first: bookings need their remote ids
+        while True:
+            rows = conn.execute(
+                "SELECT customer_id, name, email, phone FROM customers "
+                "WHERE remote_id IS NULL ORDER BY customer_id LIMIT ?",
+                (self.batch_size,),
+            ).fetchall()
+            if not rows:
+                break
+            records = [{"name": name, "email": email, "phone": phone} for _, name, email, phone in rows]
+            remote = self._insert("customers", records)
+            self._record_remote_ids(conn, "customers", "customer_id", rows, [r["customer_id"] for r in remote])
+            pushed += len(rows)
+
+        while True:
+            rows = conn.execute(
+                "SELECT b.id, c.remote_id, b.room_type, b.check_in, b.check_out "
+                "FROM bookings b JOIN customers c ON c.customer_id = b.customer_id "
+                "WHERE b.remote_id IS NULL AND c.remote_id IS NOT NULL ORDER BY b.id LIMIT ?",
+                (self.batch_size,),
+            ).fetchall()
+            if not rows:
+                break
+            records = [
+                {"customer_id": customer_id, "room_type": room_type, "check_in": check_in, "check_out": check_out}
+                for _, customer_id, room_type, check_in, check_out in rows
+            ]
+            remote = self._insert("bookings", records)
+            self._record_remote_ids(conn, "bookings", "id", rows, [r["id"] for r in remote])
+            pushed += len(rows)
+
+        self.synced_rows += pushed
+        return pushed
+
+    def _insert(self, table: str, records: list) -> list:
+        # A single multi-row INSERT ... RETURNING gives rows back in order
+        remote = self._client.table(table).insert(records).execute().data
+        if len(remote) != len(records):
+            raise RuntimeError(f"Supabase returned {len(remote)} {table} rows for {len(records)} inserted")
+        return remote
+
+    @staticmethod
+    def _record_remote_ids(conn, table: str, key: str, rows: list, remote_ids: list):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                f"UPDATE {table} SET remote_id = ? WHERE {key} = ?",
+                [(str(remote_id), row[0]) for remote_id, row in zip(remote_ids, rows)],
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+
+# ----------------------------
+# Configured backend
+# ----------------------------
+@lru_cache(maxsize=1)
+def get_booking_store() -> BookingStore:
+    """
+    Build the store named by BOOKING_STORE_URL:
+    supabase (default) or sqlite:///path/to/bookings.db.
+    """
+    url = get_secret("BOOKING_STORE_URL", "supabase")
+
+    if url == "supabase":
+        return SupabaseBookingStore()
+    if url.startswith("sqlite:///"):
+        store = SQLiteBookingStore(url[len("sqlite:///"):])
+        if str(get_secret("BOOKING_SYNC_TO_SUPABASE", "")).lower() in ("1", "true", "yes"):
+            store.replicator = SupabaseReplicator(
+                store,
+                interval_seconds=float(get_secret("BOOKING_SYNC_INTERVAL_SECONDS", 30.0)),
+            ).start()
+        return store
+
+    raise ValueError(f"Unsupported BOOKING_STORE_URL: {url}")
+
+
 def insert_customer(name: str, email: str, phone: str):
-    supabase = get_supabase_client()
-    response = supabase.table("customers").insert({
-        "name": name,
-        "email": email,
-        "phone": phone
-    }).execute()
-    return response.data[0]["customer_id"]
+    return get_booking_store().insert_customer(name, email, phone)
 
 
 def insert_booking(customer_id: str, room_type: str, check_in: str, check_out: str):
-    supabase = get_supabase_client()
-    response = supabase.table("bookings").insert({
-        "customer_id": customer_id,
-        "room_type": room_type,
-        "check_in": check_in,
-        "check_out": check_out
-    }).execute()
-    return response.data[0]["id"]
+    return get_booking_store().insert_booking(customer_id, room_type, check_in, check_out)
+
+
+def save_booking(name: str, email: str, phone: str, room_type: str, check_in: str, check_out: str):
+    return get_booking_store().save_booking(name, email, phone, room_type, check_in, check_out)
 
 
 def get_all_bookings():
-    supabase = get_supabase_client()
-    response = supabase.table("bookings").select(
-        "id, room_type, check_in, check_out, status, created_at, customers(name, email)"
-    ).execute()
-    return response.data
+    return get_booking_store().get_all_bookings()
+
+
+def get_recent_bookings(limit: int = 200):
+    return get_booking_store().get_recent_bookings(limit)
+
+
+def iter_booking_pages(page_size: int = 1000):
+    """Yield bookings one page at a time, in id order."""
+    return get_booking_store().iter_booking_pages(page_size)
@@ -1,9 +1,10 @@
 from sendgrid import SendGridAPIClient
 from sendgrid.helpers.mail import Mail
 import os
-import streamlit as st
 from datetime import datetime
 
+from config import get_secret
+
 
 def send_confirmation_email(to_email: str, booking_id: str, booking_state: dict):
     """
@@ -11,12 +12,11 @@ def send_confirmation_email(to_email: str, booking_id: str, booking_state: dict)
     Uses professional HTML and plain text versions.
     """
     # Get SendGrid API key from environment or Streamlit secrets
-    try:
-        api_key = st.secrets.get("SENDGRID_API_KEY") or os.getenv("SENDGRID_API_KEY")
-    except:
-        api_key = os.getenv("SENDGRID_API_KEY")
+    api_key = get_secret("SENDGRID_API_KEY")
     
     from_email = os.getenv("SENDGRID_FROM_EMAIL", "noreply@hotelbook.com")
+    # Optional override, e.g. a local stand-in during load tests
+    api_host = get_secret("SENDGRID_API_HOST", "https://api.sendgrid.com")
 
     if not api_key:
         error_msg = (
@@ -29,7 +29,6 @@ def send_confirmation_email(to_email: str, booking_id: str, booking_state: dict)
             "Learn more: https://docs.sendgrid.com/ui/account-and-settings/api-keys"
         )
         print(error_msg)
-        st.warning(error_msg)
         return False
 
     # Create HTML email content
@@ -115,7 +114,7 @@ The Hotel Management Team
 
     try:
         # Initialize SendGrid client
-        sg = SendGridAPIClient(api_key)
+        sg = SendGridAPIClient(api_key, host=api_host)
         
         # Create email
         message = Mail(
@@ -132,12 +131,10 @@ The Hotel Management Team
         # Check response status (202 = accepted for delivery)
         if response.status_code == 202:
             print(f"✅ Email sent successfully to {to_email}")
-            st.success(f"✅ Confirmation email sent to {to_email}")
             return True
         else:
             error = f"❌ Email service returned status {response.status_code}"
             print(error)
-            st.error(error)
             return False
             
     except Exception as e:
@@ -150,10 +147,8 @@ The Hotel Management Team
                 "Check: https://app.sendgrid.com/settings/api_keys"
             )
             print(detail)
-            st.error(detail)
         else:
             error = f"❌ Failed to send email: {error_msg}"
             print(error)
-            st.error(error)
         return False
 
@@ -0,0 +1,281 @@
+"""
+Local stand-ins for the cloud services the assistant talks to.
+
+Each stand-in is a small threaded HTTP server that speaks just enough of the
+real wire protocol for the existing clients to work unchanged:
+
+- PostgREST (Supabase)  -> insert/select on customers and bookings, with
+                           simple filters, order, limit and offset
+- SendGrid              -> POST /v3/mail/send
+- Gemini                -> generateContent, embedContent, batchEmbedContents
+
+Every server sleeps for a configurable latency (plus jitter) before replying,
+so load tests can model slow upstreams without touching the network.
+"""
+
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from bench_utils import deterministic_embedding
+
+
+# -----------------------------------
+# Shared server plumbing
+# -----------------------------------
+class _StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default backlog of 5 refuses connections long before the
+    # app itself saturates, which would skew every measurement.
+    request_queue_size = 1024
+
+    def __init__(self, address, handler_cls, latency_ms: float, jitter_ms: float):
+        super().__init__(address, handler_cls)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.request_count = 0
+        self.lock = threading.Lock()
+        self.rows = {}
+
+
+class _BaseHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        # Keep load-test output readable
+        pass
+
+    def _simulate_latency(self):
+        with self.server.lock:
+            self.server.request_count += 1
+
+        delay = self.server.latency_ms
+        if self.server.jitter_ms:
+            delay += random.uniform(-self.server.jitter_ms, self.server.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000.0)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return None
+        return json.loads(self.rfile.read(length))
+
+    def _send_json(self, status: int, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_empty(self, status: int):
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+
+# -----------------------------------
+# PostgREST (Supabase)
+# -----------------------------------
+class _PostgrestHandler(_BaseHandler):
+    ID_COLUMNS = {"customers": "customer_id", "bookings": "id"}
+
+    def _table(self):
+        match = re.match(r"^/rest/v1/(\w+)", self.path)
+        return match.group(1) if match else None
+
+    def do_POST(self):
+        self._simulate_latency()
+        table = self._table()
+        if table not in self.ID_COLUMNS:
+            self._send_json(404, {"message": f"relation {table} does not exist"})
+            return
+
+        payload = self._read_json() or {}
+        records = payload if isinstance(payload, list) else [payload]
+
+        id_column = self.ID_COLUMNS[table]
+        created = []
+        with self.server.lock:
+            stored = self.server.rows.setdefault(table, [])
+            for record in records:
+                row = dict(record)
+                row.setdefault(id_column, str(uuid.uuid4()))
+                if table == "bookings":
+                    row.setdefault("status", "confirmed")
+                    row.setdefault("created_at", datetime.now(timezone.utc).isoformat())
+                # Upserts (and inserts with client-chosen ids) replace in place
+                existing = next((i for i, r in enumerate(stored) if r[id_column] == row[id_column]), None)
+                if existing is None:
+                    stored.append(row)
+                else:
+                    stored[existing] = row
+                created.append(row)
+
+        self._send_json(201, created)
+
+    def do_GET(self):
+        self._simulate_latency()
+        table = self._table()
+        if table not in self.ID_COLUMNS:
+            self._send_json(404, {"message": f"relation {table} does not exist"})
+            return
+
+        with self.server.lock:
+            rows = list(self.server.rows.get(table, []))
+            customers = {
+                c["customer_id"]: c for c in self.server.rows.get("customers", [])
+            }
+
+        rows = self._apply_query(rows)
+
+        if table == "bookings":
+            # Emulate the embedded customers(name, email) join
+            rows = [
+                {
+                    **row,
+                    "customers": {
+                        k: customers.get(row.get("customer_id"), {}).get(k)
+                        for k in ("name", "email")
+                    },
+                }
+                for row in rows
+            ]
+        self._send_json(200, rows)
+
+
+    _FILTERS = {
+        "eq": lambda a, b: a == b,
+        "gt": lambda a, b: a > b,
+        "gte": lambda a, b: a >= b,
+        "lt": lambda a, b: a < b,
+        "lte": lambda a, b: a <= b,
+    }
+
+    def _apply_query(self, rows: list) -> list:
+        """The subset of PostgREST query params the app uses: filters, order, limit, offset."""
+        params = parse_qs(urlsplit(self.path).query)
+
+        for column, values in params.items():
+            if column in ("select", "order", "limit", "offset"):
+                continue
+            op, _, operand = values[0].partition(".")
+            if op in self._FILTERS:
+                rows = [r for r in rows if r.get(column) is not None and self._FILTERS[op](str(r[column]), operand)]
+
+        if "order" in params:
+            column, _, direction = params["order"][0].partition(".")
+            rows.sort(key=lambda r: str(r.get(column)), reverse=direction == "desc")
+
+        offset = int(params.get("offset", ["0"])[0])
+        if "limit" in params:
+            return rows[offset:offset + int(params["limit"][0])]
+        return rows[offset:]
+
+
+# -----------------------------------
+# SendGrid
+# -----------------------------------
+class _SendGridHandler(_BaseHandler):
+    def do_POST(self):
+        self._simulate_latency()
+        self._read_json()
+        if not self.path.startswith("/v3/mail/send"):
+            self._send_json(404, {"errors": [{"message": "not found"}]})
+            return
+        self._send_empty(202)
+
+
+# -----------------------------------
+# Gemini (generate + embed)
+# -----------------------------------
+class _GeminiHandler(_BaseHandler):
+    @staticmethod
+    def _content_text(content: dict) -> str:
+        return " ".join(part.get("text", "") for part in (content or {}).get("parts", []))
+
+    def do_POST(self):
+        self._simulate_latency()
+        payload = self._read_json() or {}
+        method = self.path.split("?")[0].rsplit(":", 1)[-1]
+
+        if method == "generateContent":
+            prompt = " ".join(self._content_text(c) for c in payload.get("contents", []))
+            self._send_json(200, {
+                "candidates": [{
+                    "content": {
+                        "role": "model",
+                        "parts": [{"text": "Thank you for your question. Based on our hotel documentation, "
+                                           "our team will be delighted to assist you."}],
+                    },
+                    "finishReason": "STOP",
+                    "index": 0,
+                }],
+                "usageMetadata": {
+                    "promptTokenCount": len(prompt) // 4,
+                    "candidatesTokenCount": 20,
+                    "totalTokenCount": len(prompt) // 4 + 20,
+                },
+            })
+        elif method == "embedContent":
+            text = self._content_text(payload.get("content"))
+            self._send_json(200, {"embedding": {"values": deterministic_embedding(text)}})
+        elif method == "batchEmbedContents":
+            self._send_json(200, {
+                "embeddings": [
+                    {"values": deterministic_embedding(self._content_text(r.get("content")))}
+                    for r in payload.get("requests", [])
+                ]
+            })
+        else:
+            self._send_json(404, {"error": {"code": 404, "message": f"unknown method {method}"}})
+
+
+# -----------------------------------
+# Public API
+# -----------------------------------
+class StandIn:
+    """A running stand-in server. Use as a context manager or call stop()."""
+
+    def __init__(self, handler_cls, latency_ms: float = 0.0, jitter_ms: float = 0.0):
+        self._server = _StandInServer(("127.0.0.1", 0), handler_cls, latency_ms, jitter_ms)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def request_count(self) -> int:
+        return self._server.request_count
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def start_postgrest(latency_ms: float = 0.0, jitter_ms: float = 0.0) -> StandIn:
+    return StandIn(_PostgrestHandler, latency_ms, jitter_ms)
+
+
+def start_sendgrid(latency_ms: float = 0.0, jitter_ms: float = 0.0) -> StandIn:
+    return StandIn(_SendGridHandler, latency_ms, jitter_ms)
+
+
+def start_gemini(latency_ms: float = 0.0, jitter_ms: float = 0.0) -> StandIn:
+    return StandIn(_GeminiHandler, latency_ms, jitter_ms)
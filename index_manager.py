@@ -0,0 +1,310 @@
+"""
+Versioned document index with background rebuilds and atomic hot swap.
+
+Re-ingesting PDFs used to block the session and leave no usable index until
+the new one was ready. IndexManager builds each new version in a separate
+process, so PDF parsing never competes with chat turns for the GIL. Queries
+keep hitting the current version until the build finishes. The new version
+then replaces it in a single reference swap.
+
+On disk every version lives in its own folder (v0001, v0002, ...). A CURRENT
+file names the live one, so restarts resume on it and rollback is a pointer
+change. Several server processes can share one index_dir: version numbers
+are reserved by creating the folder, and each process picks up a changed
+CURRENT on its next query.
+"""
+
+import io
+import logging
+import multiprocessing
+import os
+import re
+import shutil
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from config import get_secret
+from rag_pipeline import ingest_pdfs, load_vectorstore, save_vectorstore
+
+logger = logging.getLogger(__name__)
+
+INDEX_DIR = get_secret("INDEX_DIR", "faiss_index")
+
+CURRENT_FILE = "CURRENT"
+_VERSION_DIR = re.compile(r"^v(\d+)$")
+
+
+def version_dir(index_dir: str, version: int) -> str:
+    return os.path.join(index_dir, f"v{version:04d}")
+
+
+def read_current_version(index_dir: str):
+    """Version named by index_dir/CURRENT, or None if nothing is live yet."""
+    try:
+        with open(os.path.join(index_dir, CURRENT_FILE)) as f:
+            return int(f.read().strip())
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _build_executor() -> ProcessPoolExecutor:
+    """One build process per server, shared by every IndexManager."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # spawn, not fork: the parent is a multi-threaded web server
+            _executor = ProcessPoolExecutor(
+                max_workers=1,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _executor
+
+
+def shutdown():
+    """Stop the build process (call on server shutdown)."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+def _build_version(files: list, folder_path: str):
+    """Runs in the build process: ingest `files` and write the index to folder_path."""
+    named_files = []
+    for name, data in files:
+        f = io.BytesIO(data)
+        f.name = name
+        named_files.append(f)
+
+    stats = {}
+    vectorstore = ingest_pdfs(named_files, stats=stats)
+    if vectorstore is None:
+        return None
+
+    save_vectorstore(vectorstore, folder_path)
+    return stats
+
+
+class IndexManager:
+    def __init__(self, index_dir: str = INDEX_DIR, keep_versions: int = 3, load_current: bool = True):
+        self.index_dir = index_dir
+        self.keep_versions = keep_versions
+        self.load_current = load_current
+        os.makedirs(index_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        # (version, vectorstore, CURRENT mtime) swapped as one reference, so
+        # readers never see a version number that doesn't match the index
+        self._active = (None, None, None)
+        self._building = None
+        self.last_error = None
+        self.last_stats = None
+        self.last_built_at = None
+
+        current = read_current_version(index_dir)
+        if current is not None:
+            self._activate(current, os.stat(os.path.join(index_dir, CURRENT_FILE)).st_mtime_ns)
+
+    # ----------------------------
+    # Reads (hot path)
+    # ----------------------------
+    def current(self):
+        """The live vectorstore, or None before the first build."""
+        return self._refresh()[1]
+
+    @property
+    def current_version(self):
+        return self._refresh()[0]
+
+    @property
+    def building_version(self):
+        if self._building is not None:
+            return self._building
+        # A build started by another process: a reserved folder, newer than
+        # the live version, that has no index yet
+        current = self.current_version or 0
+        pending = [v for v in self.versions() if v > current and not self._is_complete(v)]
+        return pending[-1] if pending else None
+
+    @property
+    def build_running(self) -> bool:
+        """Whether a build submitted through this manager is still running."""
+        return self._building is not None
+
+    def versions(self) -> list:
+        """Version folders on disk, oldest first, including ones still building."""
+        found = []
+        for name in os.listdir(self.index_dir):
+            match = _VERSION_DIR.match(name)
+            if match:
+                found.append(int(match.group(1)))
+        return sorted(found)
+
+    def complete_versions(self) -> list:
+        """Versions whose index has been fully written, oldest first."""
+        return [v for v in self.versions() if self._is_complete(v)]
+
+    # ----------------------------
+    # Builds
+    # ----------------------------
+    def submit(self, files: list) -> int:
+        """
+        Start building a new version from [(filename, pdf_bytes), ...].
+        Returns the version number; raises RuntimeError if a build is running.
+        """
+        with self._lock:
+            if self._building is not None:
+                raise RuntimeError(f"Index v{self._building} is still building.")
+            version = self._reserve_version()
+            self._building = version
+            self.last_error = None
+
+        started_at = time.perf_counter()
+        try:
+            future = _build_executor().submit(_build_version, files, self._version_dir(version))
+        except Exception:
+            shutil.rmtree(self._version_dir(version), ignore_errors=True)
+            with self._lock:
+                self._building = None
+            raise
+        future.add_done_callback(lambda f: self._finish_build(version, f, started_at))
+        return version
+
+    def _finish_build(self, version: int, future, started_at: float):
+        try:
+            stats = future.result()
+            if stats is None:
+                self.last_error = "No text extracted from uploaded PDFs."
+                shutil.rmtree(self._version_dir(version), ignore_errors=True)
+                return
+
+            with self._lock:
+                live = read_current_version(self.index_dir)
+                # Another process may have finished a newer build first
+                swap = live is None or version > live
+                if swap:
+                    self._activate(version)
+                    self._write_current(version)
+            self.last_stats = stats
+            self.last_built_at = time.time()
+            if swap:
+                logger.info("Index v%d live after %.1fs", version, time.perf_counter() - started_at)
+            else:
+                logger.info("Index v%d built, but newer v%d is already live", version, live)
+            self._prune()
+        except Exception as e:
+            logger.exception("Index v%d build failed", version)
+            self.last_error = f"Index v{version} build failed: {e}"
+            shutil.rmtree(self._version_dir(version), ignore_errors=True)
+        finally:
+            with self._lock:
+                self._building = None
+
+    # ----------------------------
+    # Rollback
+    # ----------------------------
+    def rollback(self, version: int = None) -> int:
+        """Make an older version live again (default: the one before current)."""
+        # A folder reserved by a running build has no index to load yet
+        available = self.complete_versions()
+        if version is None:
+            older = [v for v in available if self.current_version is None or v < self.current_version]
+            if not older:
+                raise ValueError("No earlier index version to roll back to.")
+            version = older[-1]
+        elif version not in available:
+            raise ValueError(f"Index v{version} does not exist or is still building.")
+
+        self._swap_to(version)
+        return version
+
+    # ----------------------------
+    # Internals
+    # ----------------------------
+    def _version_dir(self, version: int) -> str:
+        return version_dir(self.index_dir, version)
+
+    def _is_complete(self, version: int) -> bool:
+        return os.path.exists(os.path.join(self._version_dir(version), "index.faiss"))
+
+    def _reserve_version(self) -> int:
+        # mkdir is atomic, so two processes building at once can never
+        # claim the same version folder
+        # Called under self._lock, so read _active directly (no refresh)
+        version = max(self.versions() + [self._active[0] or 0]) + 1
+        while True:
+            try:
+                os.mkdir(self._version_dir(version))
+                return version
+            except FileExistsError:
+                version += 1
+
+    def _refresh(self) -> tuple:
+        """The active tuple, reloaded first if CURRENT changed on disk."""
+        active = self._active
+        try:
+            mtime = os.stat(os.path.join(self.index_dir, CURRENT_FILE)).st_mtime_ns
+        except FileNotFoundError:
+            return active
+        if mtime == active[2]:
+            return active
+
+        # One thread reloads; the rest keep serving the old index meanwhile
+        if not self._reload_lock.acquire(blocking=False):
+            return active
+        try:
+            with self._lock:
+                if self._active[2] != mtime:
+                    version = read_current_version(self.index_dir)
+                    if version is not None and version != self._active[0]:
+                        logger.info("Index v%d went live in another process; loading it", version)
+                        self._activate(version, mtime)
+                    else:
+                        self._active = (self._active[0], self._active[1], mtime)
+            return self._active
+        except Exception:
+            logger.exception("Reloading index from %s failed", self.index_dir)
+            return active
+        finally:
+            self._reload_lock.release()
+
+    def _activate(self, version: int, mtime: int = None):
+        # Build-only managers (see property_registry) track the version but
+        # leave loading to whoever serves queries
+        if not self.load_current:
+            if not os.path.isdir(self._version_dir(version)):
+                raise ValueError(f"Index v{version} is missing from {self.index_dir}.")
+            self._active = (version, None, mtime)
+            return
+
+        vectorstore = load_vectorstore(self._version_dir(version))
+        if vectorstore is None:
+            raise ValueError(f"Index v{version} is missing from {self.index_dir}.")
+        self._active = (version, vectorstore, mtime)
+
+    def _swap_to(self, version: int):
+        with self._lock:
+            self._activate(version)
+            self._write_current(version)
+
+    def _write_current(self, version: int):
+        # Write-then-rename so a crash never leaves a half-written pointer
+        path = os.path.join(self.index_dir, CURRENT_FILE)
+        with open(path + ".tmp", "w") as f:
+            f.write(str(version))
+        os.replace(path + ".tmp", path)
+        # Our own write must not trigger a reload
+        self._active = (self._active[0], self._active[1], os.stat(path).st_mtime_ns)
+
+    def _prune(self):
+        keep = set(self.versions()[-self.keep_versions:]) | {self.current_version}
+        for version in self.versions():
+            if version not in keep:
+                shutil.rmtree(self._version_dir(version), ignore_errors=True)
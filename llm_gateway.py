@@ -0,0 +1,168 @@
+"""
+Shared gateway for Gemini generate_content calls.
+
+At peak many sessions ask the same question at once. Without a gateway each
+one builds its own GenerativeModel and makes its own upstream call, and a
+burst can trip provider rate limits and stall every session. The gateway:
+
+- caches GenerativeModel objects per model name
+- coalesces identical in-flight prompts into one upstream call (single-flight)
+- caps concurrent upstream calls, plus the number of callers allowed to
+  wait for a slot; beyond that it fails fast with LLMOverloaded
+
+There is a blocking API (generate) for Streamlit's script threads and an
+asyncio one (agenerate) for the HTTP API. Each has its own limits, since a
+process only ever uses one of them.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from functools import lru_cache
+from typing import NamedTuple, Optional
+
+import google.generativeai as genai
+
+DEFAULT_MODEL = "gemini-2.5-flash"
+
+BUSY_MESSAGE = (
+    "I apologize, but our assistant is handling an unusually high number of requests right now. "
+    "Please try again in a moment, or contact our reservations team for immediate assistance."
+)
+
+
+class Generation(NamedTuple):
+    text: str
+    # From the response's usage_metadata; None on SDKs that don't expose it
+    prompt_tokens: Optional[int]
+
+
+def _generation(response) -> Generation:
+    usage = getattr(response, "usage_metadata", None)
+    return Generation(response.text, getattr(usage, "prompt_token_count", None))
+
+
+class LLMOverloaded(Exception):
+    """Raised instead of queueing when the gateway is at capacity."""
+
+
+@lru_cache(maxsize=8)
+def get_model(model_name: str = DEFAULT_MODEL):
+    return genai.GenerativeModel(model_name)
+
+
+class LLMGateway:
+    def __init__(
+        self,
+        max_concurrency: int = 8,
+        max_queue: int = 32,
+        queue_timeout: float = 5.0,
+        async_client: bool = True,
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        # The REST transport (used for endpoint overrides) has no async client
+        self.async_client = async_client
+
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._waiting = 0
+        self._inflight = {}
+
+        self._async_slots = None
+        self._async_waiting = 0
+        self._async_inflight = {}
+
+    # ----------------------------
+    # Blocking API
+    # ----------------------------
+    def generate(self, prompt: str, model_name: str = DEFAULT_MODEL) -> Generation:
+        key = (model_name, prompt)
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = self._call(prompt, model_name)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _call(self, prompt: str, model_name: str) -> Generation:
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                if self._waiting >= self.max_queue:
+                    raise LLMOverloaded("LLM queue is full")
+                self._waiting += 1
+            try:
+                acquired = self._slots.acquire(timeout=self.queue_timeout)
+            finally:
+                with self._lock:
+                    self._waiting -= 1
+            if not acquired:
+                raise LLMOverloaded("Timed out waiting for an LLM slot")
+
+        try:
+            return _generation(get_model(model_name).generate_content(prompt))
+        finally:
+            self._slots.release()
+
+    # ----------------------------
+    # asyncio API
+    # ----------------------------
+    async def agenerate(self, prompt: str, model_name: str = DEFAULT_MODEL) -> Generation:
+        key = (model_name, prompt)
+        task = self._async_inflight.get(key)
+        if task is None:
+            # The gateway owns the upstream call, so cancelling any caller
+            # (the first one included) never cancels it for the others
+            task = asyncio.ensure_future(self._acall(prompt, model_name))
+            self._async_inflight[key] = task
+            task.add_done_callback(lambda t: self._async_done(key, t))
+        return await asyncio.shield(task)
+
+    def _async_done(self, key: tuple, task: asyncio.Task):
+        if self._async_inflight.get(key) is task:
+            del self._async_inflight[key]
+        # Mark the error retrieved, in case every caller was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    async def _acall(self, prompt: str, model_name: str) -> Generation:
+        if self._async_slots is None:
+            self._async_slots = asyncio.Semaphore(self.max_concurrency)
+
+        if self._async_slots.locked():
+            if self._async_waiting >= self.max_queue:
+                raise LLMOverloaded("LLM queue is full")
+            self._async_waiting += 1
+            try:
+                await asyncio.wait_for(self._async_slots.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                raise LLMOverloaded("Timed out waiting for an LLM slot")
+            finally:
+                self._async_waiting -= 1
+        else:
+            await self._async_slots.acquire()
+
+        try:
+            model = get_model(model_name)
+            if self.async_client:
+                response = await model.generate_content_async(prompt)
+            else:
+                response = await asyncio.to_thread(model.generate_content, prompt)
+            return _generation(response)
+        finally:
+            self._async_slots.release()
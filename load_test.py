@@ -0,0 +1,263 @@
+"""
+Concurrent-session load test for the hotel assistant.
+
+Drives N simulated guests through handle_user_message / rag_answer at once,
+with Supabase, SendGrid and Gemini replaced by local stand-ins (see
+fake_services.py). Each session greets, asks a document question, then
+completes a full booking including the confirmation email.
+
+Usage:
+    python load_test.py --sessions 1,2,4,8,16,32 --llm-latency-ms 400
+
+The report goes to stdout, progress lines to stderr.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import fake_services
+from bench_utils import percentile
+
+ROOM_TYPES = ["standard", "deluxe", "suite"]
+
+SAMPLE_PASSAGES = [
+    "Check-in starts at 3:00 PM and check-out is at 11:00 AM. Early check-in is subject to availability.",
+    "Breakfast is served daily from 6:30 AM to 10:30 AM in the main restaurant and is included for suites.",
+    "Free cancellation is available up to 48 hours before arrival. Later cancellations incur one night's charge.",
+    "The rooftop pool and fitness centre are open from 6:00 AM to 10:00 PM for all registered guests.",
+    "Airport transfers can be arranged through the concierge for an additional fee.",
+    "Pets under 10 kg are welcome in standard and deluxe rooms with a cleaning surcharge.",
+]
+
+
+# One per sample passage. Avoid words containing a greeting ("hi", "yo"...),
+# or chat_logic answers with a greeting instead of going to RAG.
+QUESTIONS = [
+    "When does check-in start?",
+    "Is breakfast included with the room?",
+    "Can I cancel for free?",
+    "When is the rooftop pool open?",
+    "Can the concierge arrange an airport transfer?",
+    "Are pets allowed in deluxe rooms?",
+]
+
+
+def session_question(session_no: int, shared_questions: int = 0) -> str:
+    """
+    The session's document question. Identical prompts in flight share one
+    Gemini call (llm_gateway), so by default every session asks its own and
+    the test measures real LLM load. With shared_questions=N sessions cycle
+    through N questions, as guests asking the same things at peak would.
+    """
+    n = session_no % shared_questions if shared_questions else session_no
+    question = QUESTIONS[n % len(QUESTIONS)]
+    if n >= len(QUESTIONS):
+        question += f" (guest {n})"
+    return question
+
+
+def session_script(session_no: int, shared_questions: int = 0) -> list:
+    """One guest conversation: small talk, a document question, a booking."""
+    return [
+        "hello",
+        session_question(session_no, shared_questions),
+        "I want to book a room",
+        "Jane Doe",
+        f"guest{session_no}@example.com",
+        "+1 555 010 0000",
+        ROOM_TYPES[session_no % len(ROOM_TYPES)],
+        "2026-11-01",
+        "2026-11-04",
+        "confirm",
+    ]
+
+
+def point_app_at(postgrest_url: str, sendgrid_url: str, gemini_url: str):
+    """Route every external call to the stand-ins. Must run before app imports."""
+    os.environ["SUPABASE_URL"] = postgrest_url
+    # supabase-py validates the key looks like a JWT
+    os.environ["SUPABASE_KEY"] = "load.test.key"
+    os.environ["SENDGRID_API_KEY"] = "SG.load-test"
+    os.environ["SENDGRID_API_HOST"] = sendgrid_url
+    os.environ["GEMINI_API_KEY"] = "load-test"
+    os.environ["GEMINI_API_ENDPOINT"] = gemini_url
+
+
+def run_session(session_no: int, vectorstore, shared_questions: int = 0) -> list:
+    """Play one session end to end. Returns (kind, seconds, error) per turn; error is None on success."""
+    from chat_logic import initialize_chat_state, handle_user_message
+    from llm_gateway import BUSY_MESSAGE
+    from rag_pipeline import rag_answer
+
+    state = initialize_chat_state()
+    timings = []
+
+    for message in session_script(session_no, shared_questions):
+        start = time.perf_counter()
+        kind = "booking" if message == "confirm" else "chat"
+        error = None
+        try:
+            response = handle_user_message(state, message)
+            if response is None:
+                kind = "rag"
+                response = rag_answer(message, vectorstore)
+                if response == BUSY_MESSAGE:
+                    error = "LLMOverloaded: busy message returned"
+            elif kind == "booking" and "Booking confirmed" not in response:
+                error = f"booking not confirmed: {response.strip()[:80]}"
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        timings.append((kind, time.perf_counter() - start, error))
+
+    return timings
+
+
+def run_level(sessions: int, vectorstore, session_offset: int, shared_questions: int = 0) -> dict:
+    """Run `sessions` guests concurrently and summarise their turns."""
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        results = list(pool.map(
+            lambda n: run_session(session_offset + n, vectorstore, shared_questions),
+            range(sessions),
+        ))
+    wall = time.perf_counter() - start
+
+    turns = [t for session in results for t in session]
+    latencies = [seconds for _, seconds, _ in turns]
+    by_kind = {}
+    # Per turn kind: how many failed, and the first error seen
+    errors_by_kind = {}
+    for kind, seconds, error in turns:
+        by_kind.setdefault(kind, []).append(seconds)
+        if error is not None:
+            summary = errors_by_kind.setdefault(kind, {"count": 0, "first": error})
+            summary["count"] += 1
+
+    return {
+        "sessions": sessions,
+        "turns": len(turns),
+        "errors": sum(1 for _, _, error in turns if error is not None),
+        "errors_by_kind": errors_by_kind,
+        "wall_s": wall,
+        "throughput_tps": len(turns) / wall if wall else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": max(latencies) * 1000 if latencies else 0.0,
+        "p99_by_kind_ms": {k: percentile(v, 99) * 1000 for k, v in by_kind.items()},
+    }
+
+
+def find_saturation(levels: list, min_gain: float, p99_slo_ms: float):
+    """
+    First level where adding sessions stops paying off: throughput grows by
+    less than `min_gain` over the previous level, or p99 breaks the SLO.
+    """
+    for previous, current in zip(levels, levels[1:]):
+        gain = (current["throughput_tps"] - previous["throughput_tps"]) / (previous["throughput_tps"] or 1.0)
+        if gain < min_gain or (p99_slo_ms and current["p99_ms"] > p99_slo_ms):
+            return previous
+    return None
+
+
+def print_report(levels: list, saturation, counts: dict):
+    header = f"{'sessions':>8} {'turns':>6} {'errors':>6} {'turns/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}"
+    print(header)
+    print("-" * len(header))
+    for level in levels:
+        print(
+            f"{level['sessions']:>8} {level['turns']:>6} {level['errors']:>6} "
+            f"{level['throughput_tps']:>9.1f} {level['p50_ms']:>9.1f} {level['p95_ms']:>9.1f} "
+            f"{level['p99_ms']:>9.1f} {level['max_ms']:>9.1f}"
+        )
+
+    print()
+    for level in levels:
+        by_kind = ", ".join(f"{k}={v:.1f}" for k, v in sorted(level["p99_by_kind_ms"].items()))
+        print(f"p99 by turn kind @ {level['sessions']} sessions (ms): {by_kind}")
+
+    failed = [level for level in levels if level["errors_by_kind"]]
+    if failed:
+        print()
+        for level in failed:
+            for kind, summary in sorted(level["errors_by_kind"].items()):
+                print(
+                    f"errors @ {level['sessions']} sessions, {kind}: {summary['count']} "
+                    f"(first: {summary['first']})"
+                )
+
+    print()
+    if saturation:
+        print(
+            f"Saturation point: ~{saturation['sessions']} concurrent sessions "
+            f"({saturation['throughput_tps']:.1f} turns/s, p99 {saturation['p99_ms']:.1f} ms)"
+        )
+    else:
+        print("Saturation point: not reached at the tested session counts")
+    print("Upstream requests: " + ", ".join(f"{k}={v}" for k, v in counts.items()))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent-session load test against local stand-ins")
+    parser.add_argument("--sessions", default="1,2,4,8,16,32",
+                        help="comma-separated concurrent session counts to step through")
+    parser.add_argument("--db-latency-ms", type=float, default=30.0)
+    parser.add_argument("--email-latency-ms", type=float, default=150.0)
+    parser.add_argument("--llm-latency-ms", type=float, default=400.0,
+                        help="latency of the fake Gemini server (generation and embeddings)")
+    parser.add_argument("--jitter-ms", type=float, default=0.0,
+                        help="uniform +/- jitter applied to every stand-in")
+    parser.add_argument("--min-gain", type=float, default=0.10,
+                        help="throughput gain below which a level counts as saturated")
+    parser.add_argument("--p99-slo-ms", type=float, default=0.0,
+                        help="optional p99 latency SLO; exceeding it also marks saturation")
+    parser.add_argument("--shared-questions", type=int, default=0,
+                        help="sessions cycle through this many distinct RAG questions, so identical "
+                             "ones coalesce into one LLM call (default 0: every session asks its own)")
+    parser.add_argument("--json", dest="json_path", help="also write raw results to this file")
+    args = parser.parse_args(argv)
+
+    levels_to_run = [int(n) for n in args.sessions.split(",") if n.strip()]
+
+    with fake_services.start_postgrest(args.db_latency_ms, args.jitter_ms) as postgrest, \
+            fake_services.start_sendgrid(args.email_latency_ms, args.jitter_ms) as sendgrid, \
+            fake_services.start_gemini(args.llm_latency_ms, args.jitter_ms) as gemini:
+
+        point_app_at(postgrest.url, sendgrid.url, gemini.url)
+
+        from langchain_community.vectorstores import FAISS
+        from rag_pipeline import get_embeddings
+
+        vectorstore = FAISS.from_texts(SAMPLE_PASSAGES, get_embeddings())
+
+        levels = []
+        offset = 0
+        for sessions in levels_to_run:
+            level = run_level(sessions, vectorstore, offset, args.shared_questions)
+            offset += sessions
+            levels.append(level)
+            print(
+                f"... {sessions} sessions: {level['throughput_tps']:.1f} turns/s, p99 {level['p99_ms']:.1f} ms",
+                file=sys.stderr,
+            )
+
+        counts = {
+            "postgrest": postgrest.request_count,
+            "sendgrid": sendgrid.request_count,
+            "gemini": gemini.request_count,
+        }
+
+    saturation = find_saturation(levels, args.min_gain, args.p99_slo_ms)
+    print_report(levels, saturation, counts)
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({"levels": levels, "saturation": saturation, "upstream_requests": counts}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 import sys
 import os
+import uuid
 
 # ----------------------------
 # Fix import paths
@@ -10,9 +11,18 @@ if ROOT_DIR not in sys.path:
 
 import streamlit as st
 
-from chat_logic import initialize_chat_state, handle_user_message
-from rag_pipeline import ingest_pdfs, rag_answer
+from chat_logic import initialize_chat_state, handle_user_message, FALLBACK_RESPONSE
+from rag_pipeline import rag_answer, GEMINI_API_KEY
 from admin_dashboard import render_admin_dashboard
+from session_store import (
+    TurnInProgress,
+    VersionConflict,
+    claim_turn,
+    get_session_store,
+    release_turn,
+)
+from index_manager import IndexManager
+from config import CHAT_RENDER_WINDOW
 
 
 # ----------------------------
@@ -28,6 +38,10 @@ st.set_page_config(
 # ----------------------------
 page = st.sidebar.radio("Navigation", ["Chat", "Admin Dashboard"])
 
+if not GEMINI_API_KEY:
+    st.error("GEMINI_API_KEY not found in Streamlit secrets")
+    st.stop()
+
 if page == "Admin Dashboard":
     render_admin_dashboard()
     st.stop()
@@ -43,26 +57,130 @@ uploaded_files = st.sidebar.file_uploader(
     accept_multiple_files=True
 )
 
-if "vectorstore" not in st.session_state:
-    st.session_state.vectorstore = None
+@st.cache_resource
+def index_manager():
+    # Shared by every session: staff rebuild while guests keep chatting
+    return IndexManager()
+
 
 if uploaded_files and st.sidebar.button("Process Documents"):
-    with st.spinner("Processing PDFs..."):
-        st.session_state.vectorstore = ingest_pdfs(uploaded_files)
-    st.sidebar.success("Documents processed successfully!")
+    try:
+        version = index_manager().submit([(f.name, f.getvalue()) for f in uploaded_files])
+        st.sidebar.info(f"Building index v{version} in the background. Answers use the current index until it is ready.")
+    except RuntimeError as e:
+        st.sidebar.warning(str(e))
+
+
+@st.fragment(run_every="3s")
+def index_status():
+    manager = index_manager()
+
+    if manager.building_version:
+        st.caption(f"⏳ Building index v{manager.building_version}...")
+    if manager.last_error:
+        st.warning(manager.last_error)
+    if manager.current_version is None:
+        return
+
+    st.caption(f"📚 Serving index v{manager.current_version}")
+    stats = manager.last_stats
+    if stats:
+        st.caption(
+            f"Indexed {stats['chunks_kept']} of {stats['chunks_in']} chunks; "
+            f"skipped {stats['embeddings_saved']} duplicates"
+        )
+
+    older = [v for v in manager.complete_versions() if v != manager.current_version]
+    if older:
+        target = st.selectbox("Switch to version", older[::-1], format_func=lambda v: f"v{v}")
+        if st.button("Roll back"):
+            try:
+                manager.rollback(target)
+            except ValueError as e:
+                # e.g. pruned by another process since the list was drawn
+                st.warning(str(e))
+            else:
+                st.rerun()
+
+
+with st.sidebar:
+    index_status()
 
 # ----------------------------
 # Chat state init
 # ----------------------------
+@st.cache_resource
+def session_store():
+    return get_session_store()
+
+
+# The session id rides in the URL so a reload or a restarted server
+# picks the conversation (and any half-finished booking) back up.
 if "chat_state" not in st.session_state:
-    st.session_state.chat_state = initialize_chat_state()
+    session_id = st.query_params.get("sid") or uuid.uuid4().hex
+    st.query_params["sid"] = session_id
+
+    saved_state, _ = session_store().load(session_id)
+    st.session_state.session_id = session_id
+    st.session_state.chat_state = saved_state or initialize_chat_state()
+
+
+def run_booking_turn(user_input: str):
+    """
+    Run the booking logic under the session's turn lease, on top of the
+    stored state (which may include turns from another tab with the same sid).
+    Returns the response; st.stop()s if the turn can't start.
+    """
+    store = session_store()
+    session_id = st.session_state.session_id
+    try:
+        state, version = claim_turn(store, session_id, initialize_chat_state)
+    except (TurnInProgress, VersionConflict):
+        # Nothing has run yet, so resending is safe
+        st.warning("This conversation is busy in another tab. Please resend your message in a moment.")
+        st.stop()
+
+    st.session_state.chat_state = state
+    try:
+        return handle_user_message(state, user_input)
+    finally:
+        try:
+            release_turn(store, session_id, state, version)
+        except VersionConflict:
+            # Only possible if the turn outlived its lease. The reply still
+            # goes out: a booking or email may already have happened.
+            st.warning("This reply could not be saved to the conversation history.")
+
 
 # ----------------------------
 # Chat UI
 # ----------------------------
 st.title("🏨 Hotel Booking AI Assistant")
 
-for msg in st.session_state.chat_state["messages"]:
+
+def history_markdown(messages: list) -> str:
+    """Past messages as one markdown block instead of one chat bubble each."""
+    blocks = []
+    for msg in messages:
+        speaker = "🧑 **You**" if msg["role"] == "user" else "🏨 **Assistant**"
+        blocks.append(f"{speaker}\n\n{msg['content']}")
+    return "\n\n---\n\n".join(blocks)
+
+
+# chat_logic already caps history at MAX_MEMORY messages; of those only
+# the latest get live chat bubbles, the rest sit behind a toggle.
+messages = st.session_state.chat_state["messages"]
+earlier = messages[:-CHAT_RENDER_WINDOW]
+recent = messages[-CHAT_RENDER_WINDOW:]
+
+if earlier and st.toggle(
+    "Load earlier messages",
+    key="show_earlier_messages",
+    help=f"{len(earlier)} older messages are hidden"
+):
+    st.markdown(history_markdown(earlier))
+
+for msg in recent:
     with st.chat_message(msg["role"]):
         st.write(msg["content"])
 
@@ -73,21 +191,19 @@ if user_input:
         st.write(user_input)
 
     # 1️⃣ Booking logic first
-    response = handle_user_message(
-        st.session_state.chat_state,
-        user_input
-    )
+    response = run_booking_turn(user_input)
 
     # 2️⃣ If booking logic didn't handle → RAG
-    if response is None and st.session_state.vectorstore is not None:
+    vectorstore = index_manager().current()
+    if response is None and vectorstore is not None:
         response = rag_answer(
             user_input,
-            st.session_state.vectorstore
+            vectorstore
         )
 
     # 3️⃣ Final fallback
     if response is None:
-        response = "Please upload hotel documents or say *I want to book a room*."
+        response = FALLBACK_RESPONSE
 
     with st.chat_message("assistant"):
         st.write(response)
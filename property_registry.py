@@ -0,0 +1,179 @@
+"""
+Per-property document indexes for multi-hotel deployments.
+
+Each property's index lives on disk under PROPERTY_INDEX_ROOT/<property_id>,
+in the versioned layout IndexManager writes (vNNNN folders + CURRENT). The
+registry loads a property's index on its first query and keeps a bounded
+working set in memory. When the total size passes the byte budget, the least
+recently queried indexes are evicted. One process can front hundreds of
+properties while only the busy ones stay resident.
+"""
+
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from config import get_secret
+from index_manager import (
+    CURRENT_FILE,
+    INDEX_DIR,
+    IndexManager,
+    read_current_version,
+    version_dir,
+)
+from rag_pipeline import load_vectorstore
+
+logger = logging.getLogger(__name__)
+
+PROPERTY_INDEX_ROOT = get_secret("PROPERTY_INDEX_ROOT", os.path.join(INDEX_DIR, "properties"))
+PROPERTY_INDEX_CACHE_MB = int(get_secret("PROPERTY_INDEX_CACHE_MB", 512))
+
+_PROPERTY_ID = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+
+def _folder_size(path: str) -> int:
+    return sum(
+        os.path.getsize(os.path.join(path, name))
+        for name in os.listdir(path)
+        if os.path.isfile(os.path.join(path, name))
+    )
+
+
+class PropertyIndexRegistry:
+    def __init__(self, root_dir: str = PROPERTY_INDEX_ROOT, max_bytes: int = PROPERTY_INDEX_CACHE_MB * 1024 * 1024):
+        self.root_dir = root_dir
+        self.max_bytes = max_bytes
+        os.makedirs(root_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        # property_id -> (pointer_mtime, vectorstore, nbytes), least recent first
+        self._entries = OrderedDict()
+        self._bytes = 0
+        # One loader per property, so a burst of first queries loads once.
+        # Both maps only hold properties with a load or build in flight.
+        self._load_locks = {}
+        self._builders = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def property_dir(self, property_id: str) -> str:
+        if not _PROPERTY_ID.fullmatch(property_id):
+            raise ValueError(f"Invalid property id: {property_id!r}")
+        return os.path.join(self.root_dir, property_id)
+
+    def properties(self) -> list:
+        return sorted(
+            name for name in os.listdir(self.root_dir)
+            if os.path.isdir(os.path.join(self.root_dir, name))
+        )
+
+    # ----------------------------
+    # Query path
+    # ----------------------------
+    def get(self, property_id: str):
+        """The property's live vectorstore, loading it if needed; None if it has none."""
+        folder = self.property_dir(property_id)
+        pointer_mtime = self._pointer_mtime(folder)
+        if pointer_mtime is None:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(property_id)
+            # A changed CURRENT pointer means a rebuild or rollback landed
+            if entry is not None and entry[0] == pointer_mtime:
+                self._entries.move_to_end(property_id)
+                self.hits += 1
+                return entry[1]
+            load_lock = self._load_locks.setdefault(property_id, threading.Lock())
+
+        try:
+            with load_lock:
+                with self._lock:
+                    entry = self._entries.get(property_id)
+                    if entry is not None and entry[0] == pointer_mtime:
+                        self._entries.move_to_end(property_id)
+                        self.hits += 1
+                        return entry[1]
+
+                version = read_current_version(folder)
+                if version is None:
+                    return None
+                path = version_dir(folder, version)
+                vectorstore = load_vectorstore(path)
+                if vectorstore is None:
+                    return None
+                nbytes = _folder_size(path)
+
+                with self._lock:
+                    self.misses += 1
+                    self._store(property_id, (pointer_mtime, vectorstore, nbytes))
+        finally:
+            # Callers already waiting on this lock still get it; later ones
+            # find the entry, or start a new load if this one found nothing
+            with self._lock:
+                if self._load_locks.get(property_id) is load_lock:
+                    del self._load_locks[property_id]
+
+        logger.info("Loaded index for property %s (%.1f MB)", property_id, nbytes / 1e6)
+        return vectorstore
+
+    def _store(self, property_id: str, entry: tuple):
+        old = self._entries.pop(property_id, None)
+        if old is not None:
+            self._bytes -= old[2]
+
+        self._entries[property_id] = entry
+        self._bytes += entry[2]
+
+        # Never evict the index we just loaded, even if it alone is over budget
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            evicted_id, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted[2]
+            self.evictions += 1
+            logger.info("Evicted index for property %s", evicted_id)
+
+    def invalidate(self, property_id: str):
+        with self._lock:
+            entry = self._entries.pop(property_id, None)
+            if entry is not None:
+                self._bytes -= entry[2]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "resident": list(self._entries),
+                "resident_bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    # ----------------------------
+    # Builds
+    # ----------------------------
+    def builder(self, property_id: str) -> IndexManager:
+        """IndexManager for (re)building one property; it never loads the index itself."""
+        folder = self.property_dir(property_id)
+        with self._lock:
+            # An idle manager holds nothing a new one wouldn't read back from
+            # disk, so keep only those with a build running
+            for idle in [p for p, m in self._builders.items() if p != property_id and not m.build_running]:
+                del self._builders[idle]
+            if property_id not in self._builders:
+                self._builders[property_id] = IndexManager(folder, load_current=False)
+            return self._builders[property_id]
+
+    # ----------------------------
+    # Internals
+    # ----------------------------
+    @staticmethod
+    def _pointer_mtime(folder: str):
+        try:
+            return os.stat(os.path.join(folder, CURRENT_FILE)).st_mtime_ns
+        except FileNotFoundError:
+            return None
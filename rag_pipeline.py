@@ -1,8 +1,8 @@
+import logging
 import os
 import tempfile
 from typing import List
 
-import streamlit as st
 import google.generativeai as genai
 
 from langchain_community.document_loaders import PyPDFLoader
@@ -10,18 +10,57 @@ from langchain_community.vectorstores import FAISS
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
 
+from chunk_dedup import dedupe_chunks
+from config import get_secret, RAG_CANDIDATE_K
+from context_packer import estimate_tokens, pack_context
+from llm_gateway import LLMGateway, LLMOverloaded, BUSY_MESSAGE
+
+logger = logging.getLogger(__name__)
+
 
 # -----------------------------------
 # Configure Gemini (OFFICIAL SDK)
 # -----------------------------------
-if "GEMINI_API_KEY" not in st.secrets:
-    st.error("GEMINI_API_KEY not found in Streamlit secrets")
-    st.stop()
+GEMINI_API_KEY = get_secret("GEMINI_API_KEY")
+# Optional override, e.g. a local stand-in during load tests
+GEMINI_API_ENDPOINT = get_secret("GEMINI_API_ENDPOINT")
+
+# Tokens of retrieved context allowed per prompt (see context_packer)
+CONTEXT_TOKEN_BUDGET = int(get_secret("CONTEXT_TOKEN_BUDGET", 600))
+
+FALLBACK_ANSWER = "Please upload and process documents first."
+
+
+def _client_overrides() -> dict:
+    if not GEMINI_API_ENDPOINT:
+        return {}
+    return {
+        "transport": "rest",
+        "client_options": {"api_endpoint": GEMINI_API_ENDPOINT},
+    }
 
-genai.configure(api_key=st.secrets["GEMINI_API_KEY"])
+
+genai.configure(api_key=GEMINI_API_KEY, **_client_overrides())
+
+# One gateway per process, shared by every session
+llm_gateway = LLMGateway(
+    max_concurrency=int(get_secret("LLM_MAX_CONCURRENCY", 8)),
+    max_queue=int(get_secret("LLM_MAX_QUEUE", 32)),
+    queue_timeout=float(get_secret("LLM_QUEUE_TIMEOUT_SECONDS", 5.0)),
+    async_client=not GEMINI_API_ENDPOINT,
+)
+
+
+def get_embeddings():
+    return GoogleGenerativeAIEmbeddings(
+        model="models/embedding-001",
+        google_api_key=GEMINI_API_KEY,
+        **_client_overrides()
+    )
 
 
-def ingest_pdfs(uploaded_files: List):
+def load_pdf_pages(uploaded_files: List) -> List:
+    """One langchain Document per PDF page, with the uploaded filename as source."""
     documents = []
 
     for file in uploaded_files:
@@ -31,44 +70,88 @@ def ingest_pdfs(uploaded_files: List):
 
         try:
             loader = PyPDFLoader(tmp_path)
-            documents.extend(loader.load())
+            pages = loader.load()
         finally:
             os.remove(tmp_path)
 
-    if not documents:
-        st.warning("No text extracted from uploaded PDFs.")
-        return None
+        # Cite the uploaded file, not the temp copy
+        source = getattr(file, "name", None)
+        if isinstance(source, str):
+            for page in pages:
+                page.metadata["source"] = source
+        documents.extend(pages)
+
+    return documents
 
+
+def split_pages(documents: List, chunk_size: int = 700, chunk_overlap: int = 100, stats: dict = None) -> List:
+    """Chunk pages and drop duplicate chunks (see chunk_dedup)."""
     splitter = RecursiveCharacterTextSplitter(
-        chunk_size=700,
-        chunk_overlap=100
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        # Lets the context packer merge overlapping hits exactly
+        add_start_index=True
     )
 
     chunks = splitter.split_documents(documents)
 
-    # ✅ CLOUD-SAFE EMBEDDINGS (Gemini)
-    embeddings = GoogleGenerativeAIEmbeddings(
-        model="models/embedding-001",
-        google_api_key=st.secrets["GEMINI_API_KEY"]
+    # Repeated headers/footers/policy blocks would each cost an embedding
+    chunks, dedup_stats = dedupe_chunks(chunks)
+    logger.info(
+        "Dedup kept %d of %d chunks (%d exact, %d near duplicates); "
+        "saved %d embeddings in %d fewer requests",
+        dedup_stats["chunks_kept"], dedup_stats["chunks_in"],
+        dedup_stats["exact_duplicates"], dedup_stats["near_duplicates"],
+        dedup_stats["embeddings_saved"], dedup_stats["embedding_requests_saved"],
     )
+    if stats is not None:
+        stats.update(dedup_stats)
+    return chunks
 
-    return FAISS.from_documents(chunks, embeddings)
 
+def ingest_pdfs(uploaded_files: List, stats: dict = None):
+    """
+    Build a FAISS index from uploaded PDFs.
+    Pass a dict as `stats` to receive the dedup counts (see chunk_dedup).
+    """
+    documents = load_pdf_pages(uploaded_files)
+
+    if not documents:
+        logger.warning("No text extracted from uploaded PDFs.")
+        return None
+
+    chunks = split_pages(documents, stats=stats)
+
+    # ✅ CLOUD-SAFE EMBEDDINGS (Gemini)
+    return FAISS.from_documents(chunks, get_embeddings())
+
+
+def save_vectorstore(vectorstore, folder_path: str):
+    vectorstore.save_local(folder_path)
+
+
+def load_vectorstore(folder_path: str):
+    """Load an index written by save_vectorstore, or None if there is none."""
+    if not os.path.exists(os.path.join(folder_path, "index.faiss")):
+        return None
+    # The folder is written by us, never uploaded, so pickle is trusted here
+    return FAISS.load_local(
+        folder_path,
+        get_embeddings(),
+        allow_dangerous_deserialization=True
+    )
 
-def rag_answer(query: str, vectorstore):
-    if vectorstore is None:
-        return "Please upload and process documents first."
 
-    docs = vectorstore.similarity_search(query, k=3)
-    context = "\n\n".join(doc.page_content for doc in docs)
+NO_ANSWER = (
+    "I apologize, but I don't have information about that in our hotel documentation. "
+    "Please contact our reservations team at our main office or visit our website for additional assistance."
+)
 
-    prompt = f"""
-You are a professional hotel booking assistant providing exceptional guest service.
-Answer ONLY using the context below.
-If the answer is not available in the context, respond with:
-"I apologize, but I don't have information about that in our hotel documentation. Please contact our reservations team at our main office or visit our website for additional assistance."
 
-Always maintain a courteous and professional tone befitting a luxury hotel.
+def build_prompt(query: str, context: str) -> str:
+    return f"""You are a courteous, professional luxury hotel booking assistant.
+Answer ONLY from the context. If the answer is not there, reply exactly:
+"{NO_ANSWER}"
 
 Context:
 {context}
@@ -77,7 +160,53 @@ Question:
 {query}
 """
 
-    model = genai.GenerativeModel("gemini-2.5-flash")
-    response = model.generate_content(prompt)
 
-    return response.text
+def _packed_prompt(query: str, docs_and_scores) -> tuple:
+    """(prompt, packing stats) for a query."""
+    context, stats = pack_context(docs_and_scores, CONTEXT_TOKEN_BUDGET)
+    return build_prompt(query, context), stats
+
+
+def _log_prompt(prompt: str, stats: dict, generation):
+    actual = generation.prompt_tokens if generation.prompt_tokens is not None else "n/a"
+    logger.info(
+        "RAG prompt %s tokens (estimated %d; context %d/%d; %d chunks -> %d passages, "
+        "%d packed, %d repeated sentences dropped)",
+        actual, estimate_tokens(prompt), stats["context_tokens"], CONTEXT_TOKEN_BUDGET,
+        stats["chunks"], stats["passages"], stats["packed"], stats["sentences_dropped"],
+    )
+
+
+def rag_answer(query: str, vectorstore):
+    if vectorstore is None:
+        return FALLBACK_ANSWER
+
+    docs_and_scores = vectorstore.similarity_search_with_score(query, k=RAG_CANDIDATE_K)
+    prompt, stats = _packed_prompt(query, docs_and_scores)
+
+    try:
+        generation = llm_gateway.generate(prompt)
+    except LLMOverloaded:
+        logger.warning("LLM gateway overloaded; returned busy message")
+        return BUSY_MESSAGE
+
+    _log_prompt(prompt, stats, generation)
+    return generation.text
+
+
+async def rag_answer_async(query: str, vectorstore):
+    """Same as rag_answer, without blocking the event loop."""
+    if vectorstore is None:
+        return FALLBACK_ANSWER
+
+    docs_and_scores = await vectorstore.asimilarity_search_with_score(query, k=RAG_CANDIDATE_K)
+    prompt, stats = _packed_prompt(query, docs_and_scores)
+
+    try:
+        generation = await llm_gateway.agenerate(prompt)
+    except LLMOverloaded:
+        logger.warning("LLM gateway overloaded; returned busy message")
+        return BUSY_MESSAGE
+
+    _log_prompt(prompt, stats, generation)
+    return generation.text
@@ -0,0 +1,339 @@
+"""
+Offline retrieval evaluation for the RAG pipeline.
+
+Sweeps chunk size, chunk overlap, k, embedding backend and FAISS index type
+over a PDF corpus and a labeled question set. Each configuration reports
+retrieval quality (recall@k, MRR) next to its cost (ingest time, index size,
+query latency). Chunking goes through the same load/split/dedup code as
+rag_pipeline.ingest_pdfs.
+
+The default embedding backends hash words into vectors locally (see
+bench_utils.deterministic_embedding), so runs need no network and repeat
+exactly. "gemini" uses the production embedding model and needs an API key.
+
+Labels are JSON Lines, one question per line:
+
+    {"question": "When is breakfast served?",
+     "expected": "Breakfast is served daily from 6:30 AM to 10:30 AM",
+     "source": "factsheet.pdf", "page": 0}
+
+"source" and "page" (0-based) are optional. A retrieved chunk counts as
+relevant when it covers the expected passage (or the passage covers the
+chunk, for chunks shorter than the passage).
+
+Usage:
+    python retrieval_eval.py --corpus docs/ --labels labels.jsonl \\
+        --chunk-sizes 400,700,1000 --overlaps 0,100 --k 1,3,5 \\
+        --embeddings hash,hash-bigram --index-types flat,hnsw,ivf
+
+The report goes to stdout, progress lines to stderr.
+"""
+
+import argparse
+import io
+import itertools
+import json
+import math
+import os
+import re
+import sys
+import tempfile
+import time
+from typing import List
+
+from langchain_core.embeddings import Embeddings
+
+from bench_utils import deterministic_embedding, percentile
+
+EMBEDDING_BACKENDS = ["hash", "hash-bigram", "gemini"]
+INDEX_TYPES = ["flat", "hnsw", "ivf"]
+
+
+class HashEmbeddings(Embeddings):
+    """Local, deterministic stand-in for an embedding model."""
+
+    def __init__(self, ngrams: int = 1):
+        self.ngrams = ngrams
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [deterministic_embedding(text, ngrams=self.ngrams) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return deterministic_embedding(text, ngrams=self.ngrams)
+
+
+def get_backend(name: str) -> Embeddings:
+    if name == "hash":
+        return HashEmbeddings()
+    if name == "hash-bigram":
+        return HashEmbeddings(ngrams=2)
+    if name == "gemini":
+        from rag_pipeline import GEMINI_API_KEY, get_embeddings
+        if not GEMINI_API_KEY:
+            raise SystemExit("The gemini backend needs GEMINI_API_KEY.")
+        return get_embeddings()
+    raise SystemExit(f"Unknown embedding backend: {name}")
+
+
+# -----------------------------------
+# Inputs
+# -----------------------------------
+def load_corpus(paths: List[str]) -> List:
+    """PDF pages from files and/or directories of PDFs."""
+    from rag_pipeline import load_pdf_pages
+
+    pdf_paths = []
+    for path in paths:
+        if os.path.isdir(path):
+            pdf_paths.extend(
+                os.path.join(path, name) for name in sorted(os.listdir(path))
+                if name.lower().endswith(".pdf")
+            )
+        else:
+            pdf_paths.append(path)
+
+    files = []
+    for path in pdf_paths:
+        with open(path, "rb") as f:
+            named = io.BytesIO(f.read())
+        # Match how uploads are cited, so labels can name plain filenames
+        named.name = os.path.basename(path)
+        files.append(named)
+    return load_pdf_pages(files)
+
+
+def load_labels(path: str) -> List[dict]:
+    labels = []
+    with open(path) as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            label = json.loads(line)
+            if not label.get("question") or not label.get("expected"):
+                raise SystemExit(f"{path}:{line_no}: needs 'question' and 'expected'")
+            labels.append(label)
+    return labels
+
+
+# -----------------------------------
+# Relevance
+# -----------------------------------
+def _trigrams(text: str) -> set:
+    words = re.findall(r"[a-z0-9]+", text.lower())
+    if len(words) < 3:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + 3]) for i in range(len(words) - 2)}
+
+
+def is_relevant(doc, label: dict, min_coverage: float) -> bool:
+    if "source" in label and doc.metadata.get("source") != label["source"]:
+        return False
+    if "page" in label and doc.metadata.get("page") != label["page"]:
+        return False
+
+    expected = label["_trigrams"]
+    retrieved = _trigrams(doc.page_content)
+    shared = len(expected & retrieved)
+    return shared / min(len(expected), len(retrieved)) >= min_coverage
+
+
+# -----------------------------------
+# Index builds
+# -----------------------------------
+def build_index(chunks: List, vectors, embeddings: Embeddings, index_type: str):
+    """Wrap a FAISS index of the given type in a langchain vectorstore."""
+    import faiss
+    import numpy as np
+    from langchain_community.docstore.in_memory import InMemoryDocstore
+    from langchain_community.vectorstores import FAISS
+
+    matrix = np.asarray(vectors, dtype="float32")
+    dim = matrix.shape[1]
+
+    if index_type == "flat":
+        index = faiss.IndexFlatL2(dim)
+    elif index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, 32)
+    elif index_type == "ivf":
+        # sqrt(n) lists is the usual starting point; k-means needs a few
+        # points per list, so tiny corpora get fewer lists
+        nlist = max(1, min(int(math.sqrt(len(matrix))), len(matrix) // 4))
+        index = faiss.IndexIVFFlat(faiss.IndexFlatL2(dim), dim, nlist)
+        index.train(matrix)
+        index.nprobe = max(1, nlist // 4)
+    else:
+        raise SystemExit(f"Unknown index type: {index_type}")
+
+    index.add(matrix)
+    ids = [str(i) for i in range(len(chunks))]
+    return FAISS(
+        embedding_function=embeddings,
+        index=index,
+        docstore=InMemoryDocstore(dict(zip(ids, chunks))),
+        index_to_docstore_id=dict(enumerate(ids)),
+    )
+
+
+def index_size_bytes(vectorstore) -> int:
+    """Bytes on disk as written by save_local (index plus docstore)."""
+    with tempfile.TemporaryDirectory() as folder:
+        vectorstore.save_local(folder)
+        return sum(os.path.getsize(os.path.join(folder, name)) for name in os.listdir(folder))
+
+
+# -----------------------------------
+# Evaluation
+# -----------------------------------
+def evaluate(vectorstore, labels: List[dict], k: int, repeats: int, min_coverage: float) -> dict:
+    hits = 0
+    reciprocal_ranks = 0.0
+    latencies = []
+
+    for label in labels:
+        for _ in range(repeats):
+            start = time.perf_counter()
+            docs = vectorstore.similarity_search(label["question"], k=k)
+            latencies.append(time.perf_counter() - start)
+
+        for rank, doc in enumerate(docs, 1):
+            if is_relevant(doc, label, min_coverage):
+                hits += 1
+                reciprocal_ranks += 1.0 / rank
+                break
+
+    return {
+        "recall_at_k": hits / len(labels),
+        "mrr": reciprocal_ranks / len(labels),
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+def run_sweep(pages: List, labels: List[dict], args) -> List[dict]:
+    from rag_pipeline import split_pages
+
+    results = []
+    for chunk_size, overlap in itertools.product(args.chunk_sizes, args.overlaps):
+        if overlap >= chunk_size:
+            print(f"... skipping chunk_size={chunk_size} overlap={overlap}", file=sys.stderr)
+            continue
+
+        start = time.perf_counter()
+        chunks = split_pages(pages, chunk_size=chunk_size, chunk_overlap=overlap)
+        split_s = time.perf_counter() - start
+
+        for backend in args.embeddings:
+            embeddings = get_backend(backend)
+            start = time.perf_counter()
+            vectors = embeddings.embed_documents([c.page_content for c in chunks])
+            embed_s = time.perf_counter() - start
+
+            for index_type in args.index_types:
+                start = time.perf_counter()
+                vectorstore = build_index(chunks, vectors, embeddings, index_type)
+                build_s = time.perf_counter() - start
+                size = index_size_bytes(vectorstore)
+
+                for k in args.k:
+                    row = {
+                        "chunk_size": chunk_size,
+                        "overlap": overlap,
+                        "embeddings": backend,
+                        "index": index_type,
+                        "k": k,
+                        "chunks": len(chunks),
+                        "ingest_s": split_s + embed_s + build_s,
+                        "index_bytes": size,
+                    }
+                    row.update(evaluate(vectorstore, labels, k, args.repeats, args.min_coverage))
+                    results.append(row)
+                    print(
+                        f"... size={chunk_size} overlap={overlap} {backend}/{index_type} k={k}: "
+                        f"recall {row['recall_at_k']:.2f}, MRR {row['mrr']:.2f}, p99 {row['p99_ms']:.2f} ms",
+                        file=sys.stderr,
+                    )
+    return results
+
+
+def print_report(results: List[dict], parse_s: float, pages: int, questions: int):
+    header = (
+        f"{'size':>5} {'ovl':>4} {'embeddings':<12} {'index':<6} {'k':>3} {'chunks':>7} "
+        f"{'recall@k':>8} {'MRR':>6} {'ingest s':>9} {'index KB':>9} {'p50 ms':>8} {'p99 ms':>8}"
+    )
+    print(header)
+    print("-" * len(header))
+    for row in results:
+        print(
+            f"{row['chunk_size']:>5} {row['overlap']:>4} {row['embeddings']:<12} {row['index']:<6} "
+            f"{row['k']:>3} {row['chunks']:>7} {row['recall_at_k']:>8.3f} {row['mrr']:>6.3f} "
+            f"{row['ingest_s']:>9.3f} {row['index_bytes'] / 1024:>9.1f} "
+            f"{row['p50_ms']:>8.3f} {row['p99_ms']:>8.3f}"
+        )
+
+    print()
+    print(f"Corpus: {pages} pages parsed in {parse_s:.2f}s (not included in ingest s); {questions} questions")
+    if results:
+        best = max(results, key=lambda r: (r["recall_at_k"], r["mrr"], -r["p99_ms"]))
+        print(
+            f"Best recall: size={best['chunk_size']} overlap={best['overlap']} "
+            f"{best['embeddings']}/{best['index']} k={best['k']} "
+            f"(recall@k {best['recall_at_k']:.3f}, MRR {best['mrr']:.3f}, p99 {best['p99_ms']:.3f} ms)"
+        )
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def _choice_list(choices: List[str]):
+    def parse(value: str) -> List[str]:
+        names = [v.strip() for v in value.split(",") if v.strip()]
+        unknown = [n for n in names if n not in choices]
+        if unknown:
+            raise argparse.ArgumentTypeError(f"unknown: {', '.join(unknown)} (choose from {', '.join(choices)})")
+        return names
+    return parse
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline retrieval quality/latency sweep")
+    parser.add_argument("--corpus", nargs="+", required=True,
+                        help="PDF files and/or directories of PDFs")
+    parser.add_argument("--labels", required=True, help="JSON Lines file of question/expected pairs")
+    parser.add_argument("--chunk-sizes", type=_int_list, default=_int_list("400,700,1000"))
+    parser.add_argument("--overlaps", type=_int_list, default=_int_list("0,100"))
+    parser.add_argument("--k", type=_int_list, default=_int_list("1,3,5"))
+    parser.add_argument("--embeddings", type=_choice_list(EMBEDDING_BACKENDS),
+                        default=["hash", "hash-bigram"],
+                        help=f"comma-separated backends: {', '.join(EMBEDDING_BACKENDS)}")
+    parser.add_argument("--index-types", type=_choice_list(INDEX_TYPES), default=list(INDEX_TYPES),
+                        help=f"comma-separated FAISS index types: {', '.join(INDEX_TYPES)}")
+    parser.add_argument("--repeats", type=int, default=5,
+                        help="times each question is timed, for stable percentiles")
+    parser.add_argument("--min-coverage", type=float, default=0.5,
+                        help="share of word trigrams a chunk must share with the expected passage")
+    parser.add_argument("--json", dest="json_path", help="also write raw results to this file")
+    args = parser.parse_args(argv)
+
+    labels = load_labels(args.labels)
+    if not labels:
+        raise SystemExit("No labeled questions to evaluate.")
+    for label in labels:
+        label["_trigrams"] = _trigrams(label["expected"])
+
+    start = time.perf_counter()
+    pages = load_corpus(args.corpus)
+    parse_s = time.perf_counter() - start
+    if not pages:
+        raise SystemExit("No text extracted from the corpus.")
+
+    results = run_sweep(pages, labels, args)
+    print_report(results, parse_s, len(pages), len(labels))
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({"results": results, "pages": len(pages), "questions": len(labels)}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""
+Pluggable store for chat sessions (messages + in-progress booking_state).
+
+Keeping session state outside the process lets any worker serve any turn and
+lets half-finished bookings survive restarts. Two backends:
+
+- SQLiteSessionStore  -> local file, for single-host deployments and dev
+- RedisSessionStore   -> any Redis-compatible server, for multiple workers
+
+Both expire idle sessions after a TTL and use optimistic versioning: load()
+returns the version read, save() only succeeds if it is still current.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+
+from config import get_secret
+
+DEFAULT_TTL_SECONDS = 24 * 60 * 60
+
+# Payloads above this size are zlib-compressed; chat histories with booking
+# summaries shrink to roughly a third.
+_COMPRESS_THRESHOLD = 512
+_RAW = b"j"
+_COMPRESSED = b"z"
+
+
+class VersionConflict(Exception):
+    """Another worker saved the session after it was loaded."""
+
+
+def serialize_state(state: dict) -> bytes:
+    payload = json.dumps(state, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    if len(payload) > _COMPRESS_THRESHOLD:
+        return _COMPRESSED + zlib.compress(payload)
+    return _RAW + payload
+
+
+def deserialize_state(blob: bytes) -> dict:
+    marker, payload = blob[:1], blob[1:]
+    if marker == _COMPRESSED:
+        payload = zlib.decompress(payload)
+    return json.loads(payload.decode("utf-8"))
+
+
+class SessionStore(ABC):
+    """Interface shared by the backends."""
+
+    @abstractmethod
+    def load(self, session_id: str) -> tuple:
+        """Returns (state, version); (None, 0) if missing or expired."""
+
+    @abstractmethod
+    def save(self, session_id: str, state: dict, expected_version: int) -> int:
+        """Write state if the stored version still equals expected_version.
+        Returns the new version, raises VersionConflict otherwise."""
+
+    @abstractmethod
+    def delete(self, session_id: str):
+        """Remove the session, if it exists."""
+
+
+# ----------------------------
+# SQLite backend
+# ----------------------------
+class SQLiteSessionStore(SessionStore):
+    PURGE_EVERY = 100
+
+    def __init__(self, path: str = "sessions.db", ttl_seconds: int = DEFAULT_TTL_SECONDS):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._local = threading.local()
+        self._saves = 0
+
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " session_id TEXT PRIMARY KEY,"
+            " version INTEGER NOT NULL,"
+            " data BLOB NOT NULL,"
+            " expires_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_expires_at ON sessions(expires_at)")
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite3 connections are not shareable across threads, and Streamlit
+        # and the API both serve sessions from a thread pool.
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def load(self, session_id: str) -> tuple:
+        row = self._conn().execute(
+            "SELECT version, data FROM sessions WHERE session_id = ? AND expires_at > ?",
+            (session_id, time.time()),
+        ).fetchone()
+        if row is None:
+            return None, 0
+        return deserialize_state(row[1]), row[0]
+
+    def save(self, session_id: str, state: dict, expected_version: int) -> int:
+        conn = self._conn()
+        now = time.time()
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT version FROM sessions WHERE session_id = ? AND expires_at > ?",
+                (session_id, now),
+            ).fetchone()
+            current = row[0] if row else 0
+            if current != expected_version:
+                raise VersionConflict(
+                    f"session {session_id} is at version {current}, expected {expected_version}"
+                )
+
+            new_version = current + 1
+            conn.execute(
+                "INSERT INTO sessions (session_id, version, data, expires_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(session_id) DO UPDATE SET "
+                "version = excluded.version, data = excluded.data, expires_at = excluded.expires_at",
+                (session_id, new_version, serialize_state(state), now + self.ttl_seconds),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+        self._saves += 1
+        if self._saves % self.PURGE_EVERY == 0:
+            self.purge_expired()
+
+        return new_version
+
+    def delete(self, session_id: str):
+        self._conn().execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def purge_expired(self):
+        self._conn().execute("DELETE FROM sessions WHERE expires_at <= ?", (time.time(),))
+
+
+# ----------------------------
+# Redis backend
+# ----------------------------
+# Compare-and-set in one round trip: bump the version only if nobody else
+# has, then store the payload and refresh the TTL.
+_CAS_SCRIPT = """
+local current = tonumber(redis.call('HGET', KEYS[1], 'v')) or 0
+if current ~= tonumber(ARGV[1]) then
+    return -current - 1
+end
+local new = current + 1
+redis.call('HSET', KEYS[1], 'v', new, 'd', ARGV[2])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return new
+"""
+
+
+class RedisSessionStore(SessionStore):
+    KEY_PREFIX = "hotel:session:"
+
+    def __init__(self, url: str = "redis://localhost:6379/0", ttl_seconds: int = DEFAULT_TTL_SECONDS):
+        import redis
+
+        self.ttl_seconds = ttl_seconds
+        self._client = redis.Redis.from_url(url)
+        self._cas = self._client.register_script(_CAS_SCRIPT)
+
+    def _key(self, session_id: str) -> str:
+        return self.KEY_PREFIX + session_id
+
+    def load(self, session_id: str) -> tuple:
+        version, data = self._client.hmget(self._key(session_id), "v", "d")
+        if data is None:
+            return None, 0
+        return deserialize_state(data), int(version)
+
+    def save(self, session_id: str, state: dict, expected_version: int) -> int:
+        result = self._cas(
+            keys=[self._key(session_id)],
+            args=[expected_version, serialize_state(state), self.ttl_seconds],
+        )
+        if result < 0:
+            raise VersionConflict(
+                f"session {session_id} is at version {-result - 1}, expected {expected_version}"
+            )
+        return result
+
+    def delete(self, session_id: str):
+        self._client.delete(self._key(session_id))
+
+
+# ----------------------------
+# Turn leases
+# ----------------------------
+# A turn leases its session in the store before running, so its side
+# effects (booking rows, emails) happen at most once even when two workers
+# or two browser tabs get a message for the same session. The lease
+# expires in case a worker dies mid-turn.
+TURN_LEASE_SECONDS = 30
+LEASE_KEY = "turn_lease_until"
+
+
+class TurnInProgress(Exception):
+    """Another worker or tab is still running a turn for this session."""
+
+
+def claim_turn(store: SessionStore, session_id: str, new_state) -> tuple:
+    """
+    Load the session and take its turn lease. Returns (state, version);
+    new_state() builds the state of a session that doesn't exist yet.
+    Raises TurnInProgress or VersionConflict before anything has run.
+    """
+    state, version = store.load(session_id)
+    if state is None:
+        state = new_state()
+
+    if state.get(LEASE_KEY, 0) > time.time():
+        raise TurnInProgress(f"session {session_id} has a turn in progress")
+
+    state[LEASE_KEY] = time.time() + TURN_LEASE_SECONDS
+    return state, store.save(session_id, state, version)
+
+
+def release_turn(store: SessionStore, session_id: str, state: dict, version: int) -> int:
+    """
+    Save the finished turn and drop its lease. Returns the new version;
+    raises VersionConflict only if the turn outlived its lease.
+    """
+    state.pop(LEASE_KEY, None)
+    return store.save(session_id, state, version)
+
+
+def get_session_store(url: str = None) -> SessionStore:
+    """
+    Build the store named by SESSION_STORE_URL:
+    sqlite:///path/to/sessions.db (default) or redis://host:port/db.
+    """
+    url = url or get_secret("SESSION_STORE_URL", "sqlite:///sessions.db")
+    ttl_seconds = int(get_secret("SESSION_TTL_SECONDS", DEFAULT_TTL_SECONDS))
+
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisSessionStore(url, ttl_seconds)
+    if url.startswith("sqlite:///"):
+        return SQLiteSessionStore(url[len("sqlite:///"):], ttl_seconds)
+
+    raise ValueError(f"Unsupported SESSION_STORE_URL: {url}")
@@ -0,0 +1,71 @@
+import numpy as np
+from langchain.schema import Document
+
+from chunk_dedup import MinHasher, _shingles, dedupe_chunks
+
+FOOTER = (
+    "Grand Harbour Hotel, 12 Quay Street. Reservations are held until 6 pm on the day "
+    "of arrival. Cancellations within 48 hours are charged one night. Page {page}"
+)
+
+
+def chunk(text, page):
+    return Document(page_content=text, metadata={"source": "hotel.pdf", "page": page})
+
+
+def test_exact_duplicates_differing_only_in_case_and_punctuation():
+    chunks = [chunk("Breakfast: 7-10 am.", 0), chunk("breakfast 7 10 AM", 3)]
+    kept, stats = dedupe_chunks(chunks)
+
+    assert kept == [chunks[0]]
+    assert stats["exact_duplicates"] == 1
+    assert stats["near_duplicates"] == 0
+    assert kept[0].metadata["duplicate_sources"] == ["hotel.pdf#page=3"]
+
+
+def test_near_duplicate_footers_are_dropped():
+    chunks = [chunk(FOOTER.format(page=page), page) for page in range(1, 6)]
+    kept, stats = dedupe_chunks(chunks)
+
+    assert kept == [chunks[0]]
+    assert stats["near_duplicates"] == 4
+    assert stats["embeddings_saved"] == 4
+    assert len(kept[0].metadata["duplicate_sources"]) == 4
+
+
+def test_distinct_chunks_are_kept():
+    chunks = [
+        chunk("The rooftop pool is heated and open from May to September.", 1),
+        chunk("Deluxe rooms have a king bed, a sofa and a harbour view.", 2),
+        chunk(FOOTER.format(page=3), 3),
+    ]
+    kept, stats = dedupe_chunks(chunks)
+
+    assert kept == chunks
+    assert stats["embeddings_saved"] == 0
+    assert all("duplicate_sources" not in c.metadata for c in kept)
+
+
+def test_embedding_requests_saved_counts_batches():
+    unique = [chunk(f"Room {i} faces the {i}th courtyard garden.", i) for i in range(60)]
+    copies = [chunk(c.page_content, 100 + i) for i, c in enumerate(unique)]
+    kept, stats = dedupe_chunks(unique + copies)
+
+    assert len(kept) == 60
+    # 120 texts need two batch calls, 60 need one
+    assert stats["embedding_requests_saved"] == 1
+
+
+def test_signature_estimates_jaccard_similarity():
+    hasher = MinHasher(num_perm=256)
+    words = [f"w{i}" for i in range(100)]
+    a = hasher.signature(_shingles(words, 1))
+    b = hasher.signature(_shingles(words[:50] + [f"x{i}" for i in range(50)], 1))
+
+    # True Jaccard similarity is 50 / 150
+    assert abs(np.mean(a == b) - 1 / 3) < 0.1
+
+
+def test_signatures_are_reproducible():
+    shingles = _shingles("free wifi in every room".split(), 2)
+    assert np.array_equal(MinHasher().signature(shingles), MinHasher().signature(shingles))
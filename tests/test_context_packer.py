@@ -0,0 +1,93 @@
+from langchain.schema import Document
+
+from context_packer import estimate_tokens, pack_context
+
+
+def chunk(text, page=0, start=None, source="hotel.pdf"):
+    metadata = {"source": source, "page": page}
+    if start is not None:
+        metadata["start_index"] = start
+    return Document(page_content=text, metadata=metadata)
+
+
+PAGE = (
+    "Check-in starts at 3 pm. Check-out is at 11 am. "
+    "Breakfast is served from 7 to 10 am in the lobby restaurant. "
+    "The pool is open from 8 am to 8 pm."
+)
+
+
+def test_empty_results():
+    context, stats = pack_context([], token_budget=100)
+    assert context == ""
+    assert stats == {"chunks": 0, "passages": 0, "packed": 0, "sentences_dropped": 0, "context_tokens": 0}
+
+
+def test_overlapping_chunks_with_offsets_merge_into_one_passage():
+    first, second = PAGE[:80], PAGE[50:]
+    context, stats = pack_context([(chunk(first, start=0), 0.2), (chunk(second, start=50), 0.3)], 500)
+
+    assert context == PAGE
+    assert stats["passages"] == 1
+
+
+def test_overlapping_chunks_without_offsets_merge_on_text():
+    first, second = PAGE[:80], PAGE[50:]
+    context, stats = pack_context([(chunk(second), 0.3), (chunk(first), 0.2)], 500)
+
+    assert context == PAGE
+    assert stats["passages"] == 1
+
+
+def test_chunks_from_different_pages_stay_separate():
+    a = "Parking costs 20 dollars per night."
+    b = "Pets are welcome in standard rooms."
+    _, stats = pack_context([(chunk(a, page=1), 0.1), (chunk(b, page=2), 0.2)], 500)
+    assert stats["passages"] == 2
+
+
+def test_best_score_packed_first_and_repeated_sentences_dropped():
+    footer = "Call reception on extension 9 for help."
+    best = chunk(f"Late check-out costs 30 dollars. {footer}", page=1)
+    worse = chunk(f"Room service runs until midnight. {footer}", page=4)
+
+    context, stats = pack_context([(worse, 0.5), (best, 0.1)], 500)
+
+    assert context == (
+        f"Late check-out costs 30 dollars. {footer}\n\n"
+        "Room service runs until midnight."
+    )
+    assert stats["sentences_dropped"] == 1
+
+
+def test_budget_skips_passages_that_do_not_fit():
+    short = "Wifi is free."
+    long = "The spa offers massages and facials. " * 10
+    context, stats = pack_context(
+        [(chunk(short, page=1), 0.1), (chunk(long, page=2), 0.2), (chunk("Gym is 24h.", page=3), 0.3)],
+        token_budget=10,
+    )
+
+    assert context == "Wifi is free.\n\nGym is 24h."
+    assert stats["packed"] == 2
+    assert stats["context_tokens"] <= 10
+
+
+def test_best_passage_is_truncated_rather_than_sending_nothing():
+    long = "The spa offers massages and facials. " * 10
+    context, stats = pack_context([(chunk(long), 0.1)], token_budget=5)
+
+    assert context == long.strip()[:20]
+    assert stats["context_tokens"] == estimate_tokens(context) == 5
+
+
+def test_sentences_of_skipped_passage_are_not_marked_seen():
+    # The oversized passage is skipped, so its sentence must still be
+    # allowed through from the smaller one that follows.
+    shared = "Airport shuttle leaves hourly."
+    long = f"{shared} " + "Valet parking is available at the main entrance. " * 5
+    context, _ = pack_context(
+        [(chunk("Wifi is free.", page=1), 0.1), (chunk(long, page=2), 0.2), (chunk(shared, page=3), 0.3)],
+        token_budget=15,
+    )
+    assert context == f"Wifi is free.\n\n{shared}"
@@ -0,0 +1,201 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+import fake_services
+from database import BookingStore, SQLiteBookingStore, SupabaseReplicator
+
+GUEST = ("Jane Doe", "jane@example.com", "+1 555 010 0000")
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SQLiteBookingStore(str(tmp_path / "bookings.db"))
+
+
+def book(store, n: int = 0, name: str = "Jane Doe") -> str:
+    return store.save_booking(
+        name, f"guest{n}@example.com", "+1 555 010 0000",
+        "suite", f"2026-11-{n % 28 + 1:02d}", "2026-12-01",
+    )
+
+
+def wait_until(condition):
+    deadline = time.time() + 5
+    while not condition():
+        assert time.time() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def block_writer(store) -> sqlite3.Connection:
+    """
+    Hold the write lock from outside and send one booking, so the writer
+    thread sits in BEGIN IMMEDIATE while later bookings queue up behind it.
+    Commit the returned connection to let it go.
+    """
+    blocker = sqlite3.connect(store.path, isolation_level=None)
+    blocker.execute("BEGIN IMMEDIATE")
+    threading.Thread(target=book, args=(store, 999)).start()
+    wait_until(lambda: store._writer is not None and store._writes.qsize() == 0)
+    return blocker
+
+
+def test_booking_store_is_abstract():
+    with pytest.raises(TypeError):
+        BookingStore()
+
+
+# ----------------------------
+# SQLite backend
+# ----------------------------
+def test_save_booking_round_trip(store):
+    booking_id = store.save_booking(*GUEST, "deluxe", "2026-11-01", "2026-11-03")
+
+    [row] = store.get_all_bookings()
+    assert row["id"] == booking_id
+    assert row["room_type"] == "deluxe"
+    assert row["status"] == "confirmed"
+    assert row["customers"] == {"name": "Jane Doe", "email": "jane@example.com"}
+
+
+def test_insert_customer_then_booking(store):
+    customer_id = store.insert_customer(*GUEST)
+    booking_id = store.insert_booking(customer_id, "standard", "2026-11-01", "2026-11-02")
+    assert [row["id"] for row in store.get_all_bookings()] == [booking_id]
+
+
+def test_booking_for_unknown_customer_is_rejected(store):
+    with pytest.raises(sqlite3.IntegrityError):
+        store.insert_booking("no-such-customer", "suite", "2026-11-01", "2026-11-02")
+
+
+def test_recent_bookings_newest_first(store):
+    ids = [book(store, n) for n in range(5)]
+    assert [row["id"] for row in store.get_recent_bookings(3)] == ids[::-1][:3]
+
+
+def test_pages_cover_every_booking_once_in_id_order(store):
+    ids = [book(store, n) for n in range(25)]
+    pages = list(store.iter_booking_pages(page_size=10))
+
+    assert [len(page) for page in pages] == [10, 10, 5]
+    assert [row["id"] for page in pages for row in page] == sorted(ids)
+
+
+def test_exact_multiple_of_page_size_ends_with_empty_fetch(store):
+    for n in range(20):
+        book(store, n)
+    assert [len(page) for page in store.iter_booking_pages(page_size=10)] == [10, 10]
+
+
+# ----------------------------
+# Group commit
+# ----------------------------
+def test_concurrent_saves_share_commits(store):
+    def worker(thread_no):
+        for n in range(50):
+            book(store, thread_no * 50 + n)
+
+    threads = [threading.Thread(target=worker, args=(t,)) for t in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(store.get_all_bookings()) == 400
+    assert store.commits < 400
+
+
+def test_writes_queued_during_a_commit_go_out_together(store):
+    blocker = block_writer(store)
+    threads = [threading.Thread(target=book, args=(store, n)) for n in range(20)]
+    for thread in threads:
+        thread.start()
+    wait_until(lambda: store._writes.qsize() == 20)
+    blocker.execute("COMMIT")
+    for thread in threads:
+        thread.join()
+
+    wait_until(lambda: len(store.get_all_bookings()) == 21)
+    assert store.commits == 2
+
+
+def test_bad_booking_fails_alone(store):
+    blocker = block_writer(store)
+    results = {}
+
+    def save(n, name):
+        try:
+            results[n] = book(store, n, name)
+        except Exception as e:
+            results[n] = e
+
+    # customers.name is NOT NULL, so guest 1 fails inside the shared batch
+    threads = [threading.Thread(target=save, args=(n, name)) for n, name in ((0, "A"), (1, None), (2, "C"))]
+    for thread in threads:
+        thread.start()
+    wait_until(lambda: store._writes.qsize() == 3)
+    blocker.execute("COMMIT")
+    for thread in threads:
+        thread.join()
+
+    assert isinstance(results[1], sqlite3.IntegrityError)
+    saved = {row["id"] for row in store.get_all_bookings()}
+    assert {results[0], results[2]} <= saved
+    assert len(saved) == 3
+
+
+# ----------------------------
+# Replication
+# ----------------------------
+@pytest.fixture
+def replicator(store, monkeypatch):
+    with fake_services.start_postgrest() as postgrest:
+        monkeypatch.setenv("SUPABASE_URL", postgrest.url)
+        # supabase-py validates the key looks like a JWT
+        monkeypatch.setenv("SUPABASE_KEY", "test.test.key")
+        yield SupabaseReplicator(store, batch_size=4)
+
+
+def test_sync_pushes_pending_rows_with_upstream_ids(store, replicator):
+    local_ids = [book(store, n) for n in range(6)]
+    assert replicator.pending() == {"customers": 6, "bookings": 6}
+
+    assert replicator.sync_once() == 12
+    assert replicator.pending() == {"customers": 0, "bookings": 0}
+    assert replicator.sync_once() == 0
+
+    upstream = replicator._client.table("bookings").select("id, customer_id, check_in").execute().data
+    upstream_customers = {
+        row["customer_id"]: row["email"]
+        for row in replicator._client.table("customers").select("customer_id, email").execute().data
+    }
+    conn = store._conn()
+    mapping = dict(conn.execute("SELECT id, remote_id FROM bookings").fetchall())
+
+    # Supabase assigned its own ids, recorded locally against each booking
+    assert sorted(mapping) == sorted(local_ids)
+    assert sorted(mapping.values()) == sorted(row["id"] for row in upstream)
+    assert not set(mapping.values()) & set(local_ids)
+    # ...and bookings point at their customer's upstream id
+    assert sorted(upstream_customers[row["customer_id"]] for row in upstream) == sorted(
+        f"guest{n}@example.com" for n in range(6)
+    )
+
+
+def test_sync_picks_up_rows_written_after_a_sync(store, replicator):
+    book(store, 0)
+    replicator.sync_once()
+    book(store, 1)
+    assert replicator.sync_once() == 2
+    assert replicator.pending() == {"customers": 0, "bookings": 0}
+
+
+def test_check_schema_rejects_missing_upstream_table(replicator, monkeypatch):
+    replicator.check_schema()
+
+    monkeypatch.setattr(SupabaseReplicator, "UPSTREAM_COLUMNS", {"payments": ("id",)})
+    with pytest.raises(RuntimeError):
+        replicator.check_schema()
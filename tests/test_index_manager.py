@@ -0,0 +1,43 @@
+import os
+
+import pytest
+
+import index_manager
+from index_manager import IndexManager, version_dir
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    """v1 and v2 built, v2 live, and v3 reserved by a build still running."""
+    monkeypatch.setattr(index_manager, "load_vectorstore", lambda path: f"store:{os.path.basename(path)}")
+    for version in (1, 2):
+        folder = version_dir(str(tmp_path), version)
+        os.makedirs(folder)
+        open(os.path.join(folder, "index.faiss"), "w").close()
+    os.makedirs(version_dir(str(tmp_path), 3))
+
+    manager = IndexManager(str(tmp_path))
+    manager._swap_to(2)
+    return manager
+
+
+def test_complete_versions_skip_a_running_build(manager):
+    assert manager.versions() == [1, 2, 3]
+    assert manager.complete_versions() == [1, 2]
+    assert manager.building_version == 3
+
+
+def test_rollback_to_a_running_build_is_refused(manager):
+    with pytest.raises(ValueError):
+        manager.rollback(3)
+    assert manager.current_version == 2
+
+
+def test_default_rollback_target_skips_a_running_build(manager):
+    # With nothing live, every folder counts as older; the newest complete
+    # one must win over the half-built v3
+    os.remove(os.path.join(manager.index_dir, index_manager.CURRENT_FILE))
+    fresh = IndexManager(manager.index_dir)
+
+    assert fresh.rollback() == 2
+    assert fresh.current() == "store:v0002"
@@ -0,0 +1,170 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+import llm_gateway
+from llm_gateway import Generation, LLMGateway, LLMOverloaded
+
+
+class FakeModel:
+    """Stands in for genai.GenerativeModel: slow, counted calls."""
+
+    def __init__(self, delay: float = 0.2):
+        self.delay = delay
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def _response(self, prompt):
+        with self._lock:
+            self.calls.append(prompt)
+        return SimpleNamespace(text=f"answer to {prompt}", usage_metadata=SimpleNamespace(prompt_token_count=42))
+
+    def generate_content(self, prompt):
+        time.sleep(self.delay)
+        return self._response(prompt)
+
+    async def generate_content_async(self, prompt):
+        await asyncio.sleep(self.delay)
+        return self._response(prompt)
+
+
+@pytest.fixture
+def model(monkeypatch):
+    fake = FakeModel()
+    monkeypatch.setattr(llm_gateway, "get_model", lambda model_name=llm_gateway.DEFAULT_MODEL: fake)
+    return fake
+
+
+def run_threads(fn, args):
+    with ThreadPoolExecutor(max_workers=len(args)) as pool:
+        futures = [pool.submit(fn, arg) for arg in args]
+        return [f.exception() or f.result() for f in futures]
+
+
+# ----------------------------
+# Blocking API
+# ----------------------------
+def test_identical_prompts_share_one_call(model):
+    gateway = LLMGateway()
+    results = run_threads(gateway.generate, ["Is breakfast included?"] * 8)
+
+    assert len(model.calls) == 1
+    assert results == [Generation("answer to Is breakfast included?", 42)] * 8
+    assert gateway._inflight == {}
+
+
+def test_distinct_prompts_each_get_a_call(model):
+    gateway = LLMGateway()
+    run_threads(gateway.generate, [f"question {n}" for n in range(4)])
+    assert sorted(model.calls) == [f"question {n}" for n in range(4)]
+
+
+def test_full_queue_fails_fast(model):
+    gateway = LLMGateway(max_concurrency=1, max_queue=1, queue_timeout=5.0)
+    results = run_threads(gateway.generate, ["a", "b", "c"])
+
+    # One runs, one waits for the slot, the third is turned away
+    assert sum(isinstance(r, LLMOverloaded) for r in results) == 1
+    assert len(model.calls) == 2
+
+
+def test_queue_timeout_raises_overloaded(model):
+    model.delay = 0.5
+    gateway = LLMGateway(max_concurrency=1, max_queue=4, queue_timeout=0.05)
+    results = run_threads(gateway.generate, ["a", "b"])
+
+    assert sum(isinstance(r, LLMOverloaded) for r in results) == 1
+    assert gateway._waiting == 0
+
+
+def test_leader_error_reaches_followers_and_is_not_cached(model):
+    gateway = LLMGateway()
+    original = model.generate_content
+
+    def failing(prompt):
+        time.sleep(0.1)
+        raise RuntimeError("upstream down")
+
+    model.generate_content = failing
+    results = run_threads(gateway.generate, ["q"] * 4)
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+    model.generate_content = original
+    assert gateway.generate("q").text == "answer to q"
+
+
+# ----------------------------
+# asyncio API
+# ----------------------------
+def test_async_identical_prompts_share_one_call(model):
+    gateway = LLMGateway()
+
+    async def burst():
+        return await asyncio.gather(*(gateway.agenerate("Is breakfast included?") for _ in range(8)))
+
+    results = asyncio.run(burst())
+    assert len(model.calls) == 1
+    assert results == [Generation("answer to Is breakfast included?", 42)] * 8
+    assert gateway._async_inflight == {}
+
+
+def test_async_full_queue_fails_fast(model):
+    gateway = LLMGateway(max_concurrency=1, max_queue=1, queue_timeout=5.0)
+
+    async def burst():
+        return await asyncio.gather(*(gateway.agenerate(p) for p in "abc"), return_exceptions=True)
+
+    results = asyncio.run(burst())
+    assert sum(isinstance(r, LLMOverloaded) for r in results) == 1
+    assert len(model.calls) == 2
+
+
+def test_async_queue_timeout_raises_overloaded(model):
+    model.delay = 0.5
+    gateway = LLMGateway(max_concurrency=1, max_queue=4, queue_timeout=0.05)
+
+    async def burst():
+        return await asyncio.gather(gateway.agenerate("a"), gateway.agenerate("b"), return_exceptions=True)
+
+    results = asyncio.run(burst())
+    assert sum(isinstance(r, LLMOverloaded) for r in results) == 1
+    assert gateway._async_waiting == 0
+
+
+def test_follower_survives_leader_cancellation(model):
+    gateway = LLMGateway()
+
+    async def scenario():
+        leader = asyncio.ensure_future(gateway.agenerate("q"))
+        await asyncio.sleep(0.01)
+        follower = asyncio.ensure_future(gateway.agenerate("q"))
+        await asyncio.sleep(0.01)
+
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(scenario()) == Generation("answer to q", 42)
+    assert len(model.calls) == 1
+
+
+def test_call_finishes_when_every_caller_is_cancelled(model):
+    gateway = LLMGateway()
+
+    async def scenario():
+        caller = asyncio.ensure_future(gateway.agenerate("q"))
+        await asyncio.sleep(0.01)
+        caller.cancel()
+        # The upstream call is still in flight, so a new caller joins it
+        result = await gateway.agenerate("q")
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(scenario()).text == "answer to q"
+    assert len(model.calls) == 1
+    assert gateway._async_inflight == {}
@@ -0,0 +1,77 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import property_registry
+from index_manager import CURRENT_FILE, version_dir
+from property_registry import PropertyIndexRegistry
+
+
+@pytest.fixture
+def registry(tmp_path):
+    return PropertyIndexRegistry(str(tmp_path))
+
+
+@pytest.mark.parametrize("property_id", ["hotel-1", "Harbour_View", "x" * 64])
+def test_valid_property_ids(registry, property_id):
+    assert registry.property_dir(property_id) == os.path.join(registry.root_dir, property_id)
+
+
+@pytest.mark.parametrize("property_id", ["", "x" * 65, "../hotel", "hotel/1", "hotel 1", "hotel-1\n", "\nhotel-1"])
+def test_invalid_property_ids(registry, property_id):
+    with pytest.raises(ValueError):
+        registry.property_dir(property_id)
+
+
+def make_index(registry, property_id, version=1):
+    folder = version_dir(registry.property_dir(property_id), version)
+    os.makedirs(folder)
+    with open(os.path.join(folder, "index.faiss"), "wb") as f:
+        f.write(b"\0" * 1000)
+    with open(os.path.join(registry.property_dir(property_id), CURRENT_FILE), "w") as f:
+        f.write(str(version))
+
+
+def test_burst_of_first_queries_loads_once_and_leaves_no_locks(registry, monkeypatch):
+    loads = []
+
+    def slow_load(path):
+        loads.append(path)
+        time.sleep(0.1)
+        return f"store:{path}"
+
+    monkeypatch.setattr(property_registry, "load_vectorstore", slow_load)
+    make_index(registry, "hotel-1")
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: registry.get("hotel-1"), range(8)))
+
+    assert len(loads) == 1
+    assert set(results) == {f"store:{loads[0]}"}
+    assert registry._load_locks == {}
+
+
+def test_evicted_property_leaves_nothing_behind(registry, monkeypatch):
+    monkeypatch.setattr(property_registry, "load_vectorstore", lambda path: object())
+    registry.max_bytes = 1500
+    for property_id in ("hotel-1", "hotel-2", "hotel-3"):
+        make_index(registry, property_id)
+        registry.get(property_id)
+
+    assert registry.stats()["resident"] == ["hotel-3"]
+    assert registry._load_locks == {}
+
+
+def test_only_builders_with_a_build_running_are_kept(registry):
+    busy = registry.builder("hotel-1")
+    busy._building = 1
+    registry.builder("hotel-2")
+    registry.builder("hotel-3")
+
+    assert sorted(registry._builders) == ["hotel-1", "hotel-3"]
+
+    busy._building = None
+    registry.builder("hotel-4")
+    assert sorted(registry._builders) == ["hotel-4"]
@@ -0,0 +1,181 @@
+import json
+import time
+import uuid
+
+import pytest
+
+import session_store
+from session_store import (
+    LEASE_KEY,
+    RedisSessionStore,
+    SessionStore,
+    SQLiteSessionStore,
+    TurnInProgress,
+    VersionConflict,
+    claim_turn,
+    deserialize_state,
+    release_turn,
+    serialize_state,
+)
+
+SMALL_STATE = {"messages": [{"role": "user", "content": "Hi 👋"}], "booking_active": False}
+LARGE_STATE = {
+    "messages": [
+        {"role": "assistant", "content": f"✅ Got it! Check-in is 2026-01-{day:02d}. Which room would you like?"}
+        for day in range(1, 26)
+    ],
+    "booking_active": True,
+    "booking_state": {"name": "Ada Lovelace", "room_type": "deluxe", "current_field": "check_out"},
+}
+
+
+@pytest.fixture(params=["sqlite", "redis"])
+def make_store(request, tmp_path):
+    """Factory for a store on either backend, so each test runs against both."""
+    if request.param == "sqlite":
+        return lambda ttl_seconds=60: SQLiteSessionStore(str(tmp_path / "sessions.db"), ttl_seconds)
+
+    url = request.getfixturevalue("redis_url")
+    return lambda ttl_seconds=60: RedisSessionStore(url, ttl_seconds)
+
+
+@pytest.fixture
+def session_id():
+    return uuid.uuid4().hex
+
+
+# ----------------------------
+# Serialization
+# ----------------------------
+def test_small_state_is_stored_raw():
+    blob = serialize_state(SMALL_STATE)
+    assert blob[:1] == b"j"
+    assert deserialize_state(blob) == SMALL_STATE
+
+
+def test_large_state_is_compressed():
+    blob = serialize_state(LARGE_STATE)
+    assert blob[:1] == b"z"
+    assert len(blob) < len(json.dumps(LARGE_STATE, ensure_ascii=False).encode("utf-8"))
+    assert deserialize_state(blob) == LARGE_STATE
+
+
+def test_session_store_is_abstract():
+    with pytest.raises(TypeError):
+        SessionStore()
+
+
+# ----------------------------
+# Both backends
+# ----------------------------
+def test_missing_session_loads_empty(make_store, session_id):
+    assert make_store().load(session_id) == (None, 0)
+
+
+@pytest.mark.parametrize("state", [SMALL_STATE, LARGE_STATE], ids=["raw", "compressed"])
+def test_round_trip(make_store, session_id, state):
+    store = make_store()
+    assert store.save(session_id, state, 0) == 1
+    assert store.load(session_id) == (state, 1)
+
+
+def test_versions_advance(make_store, session_id):
+    store = make_store()
+    version = store.save(session_id, SMALL_STATE, 0)
+    version = store.save(session_id, LARGE_STATE, version)
+    assert store.load(session_id) == (LARGE_STATE, 2)
+
+
+def test_stale_version_raises_conflict(make_store, session_id):
+    store = make_store()
+    store.save(session_id, SMALL_STATE, 0)
+
+    # Two workers loaded version 1; the second save must not clobber the first
+    _, version = store.load(session_id)
+    store.save(session_id, LARGE_STATE, version)
+    with pytest.raises(VersionConflict):
+        store.save(session_id, SMALL_STATE, version)
+
+    assert store.load(session_id) == (LARGE_STATE, 2)
+
+
+def test_new_session_conflicts_with_existing(make_store, session_id):
+    store = make_store()
+    store.save(session_id, SMALL_STATE, 0)
+    with pytest.raises(VersionConflict):
+        store.save(session_id, LARGE_STATE, 0)
+
+
+def test_idle_session_expires(make_store, session_id):
+    store = make_store(ttl_seconds=1)
+    store.save(session_id, SMALL_STATE, 0)
+    assert store.load(session_id)[0] == SMALL_STATE
+
+    time.sleep(1.5)
+    assert store.load(session_id) == (None, 0)
+    # An expired session starts over from version 0
+    assert store.save(session_id, LARGE_STATE, 0) == 1
+
+
+def test_delete(make_store, session_id):
+    store = make_store()
+    store.save(session_id, SMALL_STATE, 0)
+    store.delete(session_id)
+    assert store.load(session_id) == (None, 0)
+
+
+# ----------------------------
+# Turn leases
+# ----------------------------
+def new_state():
+    return {"messages": []}
+
+
+def test_claim_creates_missing_session_with_lease(make_store, session_id):
+    store = make_store()
+    state, version = claim_turn(store, session_id, new_state)
+
+    assert version == 1
+    assert state["messages"] == []
+    assert store.load(session_id)[0][LEASE_KEY] > time.time()
+
+
+def test_second_claim_is_refused_until_release(make_store, session_id):
+    store = make_store()
+    state, version = claim_turn(store, session_id, new_state)
+    with pytest.raises(TurnInProgress):
+        claim_turn(store, session_id, new_state)
+
+    state["messages"].append({"role": "user", "content": "confirm"})
+    release_turn(store, session_id, state, version)
+
+    saved, _ = store.load(session_id)
+    assert LEASE_KEY not in saved
+    state, _ = claim_turn(store, session_id, new_state)
+    assert state["messages"] == [{"role": "user", "content": "confirm"}]
+
+
+def test_expired_lease_can_be_taken_over(make_store, session_id, monkeypatch):
+    store = make_store()
+    monkeypatch.setattr(session_store, "TURN_LEASE_SECONDS", -1)
+    _, stale_version = claim_turn(store, session_id, new_state)
+
+    # A worker that died mid-turn doesn't lock the session forever...
+    state, version = claim_turn(store, session_id, new_state)
+    # ...and its late save can't clobber the turn that took over
+    with pytest.raises(VersionConflict):
+        release_turn(store, session_id, {"messages": []}, stale_version)
+    release_turn(store, session_id, state, version)
+
+
+# ----------------------------
+# SQLite only
+# ----------------------------
+def test_sqlite_purge_expired_removes_rows(tmp_path, session_id):
+    store = SQLiteSessionStore(str(tmp_path / "sessions.db"), ttl_seconds=1)
+    store.save(session_id, SMALL_STATE, 0)
+    time.sleep(1.1)
+    store.purge_expired()
+
+    count = store._conn().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+    assert count == 0
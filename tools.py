@@ -1,22 +1,15 @@
-from database import (
-    insert_customer,
-    insert_booking,
-)
+from database import save_booking
 from email_service import send_confirmation_email
 
 
 def save_booking_tool(booking_state: dict):
     """
-    Save confirmed booking into Supabase.
+    Save confirmed booking to the configured booking store.
     """
-    customer_id = insert_customer(
+    booking_id = save_booking(
         name=booking_state["name"],
         email=booking_state["email"],
         phone=booking_state["phone"],
-    )
-
-    booking_id = insert_booking(
-        customer_id=customer_id,
         room_type=booking_state["room_type"],
         check_in=booking_state["check_in"],
         check_out=booking_state["check_out"],